@@ -43,7 +43,7 @@
 #     )
 
 from django.contrib import admin
-from .models import FoodbankOrganization, OrganizationAdmin, Foodbank, RegistrationCode, ServiceZipcode
+from .models import FoodbankOrganization, OrganizationAdmin, Foodbank, RegistrationCode, ServiceZipcode, GeocodeJob, GeocodeCacheEntry
 
 @admin.register(FoodbankOrganization)
 class FoodbankOrganizationAdmin(admin.ModelAdmin):
@@ -73,4 +73,16 @@ class RegistrationCodeAdmin(admin.ModelAdmin):
 class ServiceZipcodeAdmin(admin.ModelAdmin):
     list_display = ('zipcode', 'city', 'state', 'foodbank', 'created_date')
     search_fields = ('zipcode', 'city', 'foodbank__name')
-    list_filter = ('state', 'foodbank')
\ No newline at end of file
+    list_filter = ('state', 'foodbank')
+
+@admin.register(GeocodeJob)
+class GeocodeJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'attempts', 'run_after', 'last_error', 'updated_date')
+    search_fields = ('foodbank__name', 'organization__name', 'last_error')
+    list_filter = ('status',)
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('normalized_address', 'latitude', 'longitude', 'source', 'expires_at')
+    search_fields = ('normalized_address',)
+    list_filter = ('source',)
@@ -0,0 +1,87 @@
+# accounts/geocode_cache.py
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import GeocodeCacheEntry
+
+# Common street words spelled out and abbreviated interchangeably
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'highway': 'hwy', 'parkway': 'pkwy',
+    'suite': 'ste', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+
+
+def normalize_address(full_address):
+    """
+    Reduce an address to a canonical form so trivially different spellings
+    ("123 Main Street, Walla Walla" / "123  main st. walla walla") share a cache entry
+    """
+    text = unicodedata.normalize('NFKD', full_address)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    words = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    return ' '.join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def address_key(normalized_address):
+    return hashlib.sha1(normalized_address.encode()).hexdigest()
+
+
+def cache_expiry(found, now=None):
+    days = settings.GEOCODE_CACHE_TTL_DAYS if found else settings.GEOCODE_CACHE_FAILURE_TTL_DAYS
+    return (now or timezone.now()) + timedelta(days=days)
+
+
+def cached_geocode(full_address):
+    """
+    The cached (latitude, longitude) for an address, (None, None) if it's cached
+    as not found, or None if there's no unexpired entry
+    """
+    entry = GeocodeCacheEntry.objects.filter(
+        key=address_key(normalize_address(full_address)), expires_at__gt=timezone.now()
+    ).values_list('latitude', 'longitude').first()
+    if entry is None:
+        return None
+
+    lat, lng = entry
+    if lat is None or lng is None:
+        return None, None
+    return float(lat), float(lng)
+
+
+def build_cache_entry(full_address, lat, lng, source, now=None):
+    normalized = normalize_address(full_address)
+    found = lat is not None and lng is not None
+    return GeocodeCacheEntry(
+        key=address_key(normalized),
+        normalized_address=normalized,
+        latitude=round(lat, 6) if found else None,
+        longitude=round(lng, 6) if found else None,
+        source=source,
+        expires_at=cache_expiry(found, now),
+    )
+
+
+def store_cache_entries(entries):
+    """Insert cache entries, overwriting any existing entry for the same address"""
+    # MySQL's ON DUPLICATE KEY UPDATE can't name the conflicting unique key
+    unique_fields = ('key',) if connection.features.supports_update_conflicts_with_target else None
+    GeocodeCacheEntry.objects.bulk_create(
+        entries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=('normalized_address', 'latitude', 'longitude', 'source', 'expires_at', 'updated_date'),
+    )
+
+
+def cache_geocode(full_address, lat, lng, source):
+    """Remember a geocoding result; (None, None) caches the address as not found"""
+    store_cache_entries([build_cache_entry(full_address, lat, lng, source)])
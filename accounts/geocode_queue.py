@@ -0,0 +1,146 @@
+# accounts/geocode_queue.py
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from foodbanked.geocoding import GeocodingError, format_address, get_geocoder
+from .models import Foodbank, GeocodeJob, GeocodeThrottle
+
+# Service failures are retried with a doubling delay, then given up on
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+
+# A job still "running" after this long belongs to a worker that died
+STALE_JOB_AGE = timedelta(minutes=10)
+
+
+def job_target_field(record):
+    return 'foodbank' if isinstance(record, Foodbank) else 'organization'
+
+
+def enqueue_geocode(record):
+    """Queue a foodbank or organization for geocoding; a pending job is reused"""
+    if not format_address(record.address, record.city, record.state, record.zipcode):
+        return None
+
+    target = {job_target_field(record): record}
+    pending = GeocodeJob.objects.filter(status='pending', **target)
+    if pending.update(run_after=timezone.now(), attempts=0, last_error=''):
+        return pending.first()
+    return GeocodeJob.objects.create(**target)
+
+
+def wait_for_request_slot(name, interval, burst=1):
+    """
+    Block until the named service may be called again, then take the request.
+
+    A token bucket refilling one token every `interval` seconds and holding up
+    to `burst`, kept as the time the bucket is next full (next_request_at). A
+    request is taken by compare-and-set on that shared row, so only one
+    process wins each token and the limit holds across every worker.
+    """
+    GeocodeThrottle.objects.get_or_create(name=name)
+    interval = timedelta(seconds=interval)
+    while True:
+        now = timezone.now()
+        full_at = GeocodeThrottle.objects.values_list('next_request_at', flat=True).get(name=name)
+        available_at = full_at - interval * (burst - 1)
+        if available_at > now:
+            time.sleep(max((available_at - now).total_seconds(), 0.01))
+            continue
+
+        claimed = GeocodeThrottle.objects.filter(name=name, next_request_at=full_at).update(
+            next_request_at=max(full_at, now) + interval
+        )
+        if claimed:
+            return
+
+
+def geocode_record(record, geocoder=None, offline_only=False):
+    """
+    Geocode a record's current address, respecting each geocoder's rate limit.
+    Returns (latitude, longitude) or (None, None); raises GeocodingError.
+    """
+    full_address = format_address(record.address, record.city, record.state, record.zipcode)
+    if not full_address:
+        return None, None
+
+    geocoder = geocoder or get_geocoder()
+    return geocoder.geocode(full_address, offline_only=offline_only, wait=wait_for_request_slot)
+
+
+def save_coordinates(record, lat, lng):
+    # update() rather than save(), which would queue the record again
+    type(record).objects.filter(pk=record.pk).update(latitude=round(lat, 6), longitude=round(lng, 6))
+    record.latitude, record.longitude = lat, lng
+    record.snapshot_fields(['latitude', 'longitude'])
+
+
+def geocode_or_enqueue(record):
+    """
+    Give a record coordinates right away if the cache or an offline geocoder
+    knows its address, otherwise queue it for the geocode worker
+    """
+    lat, lng = geocode_record(record, offline_only=True)
+    if lat is None or lng is None:
+        return enqueue_geocode(record)
+
+    save_coordinates(record, lat, lng)
+    return None
+
+
+def claim_next_job():
+    """Mark the next due job as running and return it, or None if nothing is due"""
+    now = timezone.now()
+    GeocodeJob.objects.filter(status='running', updated_date__lt=now - STALE_JOB_AGE).update(status='pending')
+
+    due = GeocodeJob.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'id')
+    for job_id in due.values_list('id', flat=True)[:10]:
+        # Another worker may claim the same job first; only one UPDATE wins
+        if GeocodeJob.objects.filter(pk=job_id, status='pending').update(status='running', updated_date=now):
+            return GeocodeJob.objects.select_related('foodbank', 'organization').get(pk=job_id)
+    return None
+
+
+def run_job(job, geocoder):
+    """Geocode a claimed job's record and save its coordinates; returns True on success"""
+    record = job.foodbank or job.organization
+    job.attempts += 1
+
+    try:
+        lat, lng = geocode_record(record, geocoder)
+    except GeocodingError as e:
+        job.last_error = str(e)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.save()
+        return False
+
+    if lat is None or lng is None:
+        job.status = 'failed'
+        job.last_error = "Address not found"
+        job.save()
+        return False
+
+    save_coordinates(record, lat, lng)
+
+    job.status = 'done'
+    job.last_error = ''
+    job.save()
+    return True
+
+
+def process_geocode_jobs(geocoder=None, max_jobs=None):
+    """Run due jobs until the queue is empty (or `max_jobs` ran); yields (job, succeeded)"""
+    geocoder = geocoder or get_geocoder()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            return
+        yield job, run_job(job, geocoder)
+        processed += 1
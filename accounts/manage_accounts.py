@@ -7,7 +7,6 @@ Simple menu-driven interface for managing foodbank accounts
 import os
 import sys
 import django
-from django.db.models import Q
 
 # Setup Django environment
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -189,7 +188,7 @@ def edit_foodbank():
         # Apply changes
         for key, value in pending_changes.items():
             setattr(foodbank, key, value)
-        foodbank.save()
+        foodbank.save(update_fields=foodbank.changed_fields)
         
         print("\n✓ Changes saved successfully!")
     else:
@@ -345,7 +344,7 @@ def assign_foodbank_to_organization():
     if confirm == 'Y':
         try:
             foodbank.organization = organization
-            foodbank.save()
+            foodbank.save(update_fields=['organization'])
             print(f"\n✓ '{foodbank.name}' assigned to '{organization.name}' successfully!")
         except Exception as e:
             print(f"\n✗ Error assigning food bank: {e}")
@@ -375,57 +374,10 @@ def geocode_all_locations():
     print("Starting geocoding process...")
     print("=" * 60 + "\n")
     
-    # Geocode foodbanks
+    from django.core.management import call_command
     
-    foodbanks = Foodbank.objects.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
-    print(f"Found {foodbanks.count()} foodbanks needing geocoding...\n")
-    
-    fb_success = 0
-    fb_failed = 0
-    
-    for fb in foodbanks:
-        print(f"Geocoding: {fb.name}...")
-        fb.save()  # This triggers the geocode() method
-        fb.refresh_from_db()  # <-- Add this line to reload from database
-        
-        if fb.latitude and fb.longitude:
-            print(f"  ✓ Success: {fb.latitude}, {fb.longitude}")
-            fb_success += 1
-        else:
-            print(f"  ✗ Failed: Could not geocode (check address)")
-            fb_failed += 1
-    
-    # Geocode organizations
-    print(f"\n{'-' * 60}\n")
-    orgs = FoodbankOrganization.objects.filter(latitude__isnull=True)
-    print(f"Found {orgs.count()} organizations needing geocoding...\n")
-    
-    org_success = 0
-    org_failed = 0
-    
-    for org in orgs:
-        print(f"Geocoding: {org.name}...")
-        org.save()  # This triggers the geocode() method
-        org.refresh_from_db()  # <-- Add this line to reload from database
-        
-        if org.latitude and org.longitude:
-            print(f"  ✓ Success: {org.latitude}, {org.longitude}")
-            org_success += 1
-        else:
-            print(f"  ✗ Failed: Could not geocode (check address)")
-            org_failed += 1
-    
-    # Summary
-    print(f"\n{'=' * 60}")
-    print("Geocoding Complete!")
-    print("=" * 60)
-    print(f"\nFoodbanks:")
-    print(f"  ✓ Successfully geocoded: {fb_success}")
-    print(f"  ✗ Failed: {fb_failed}")
-    print(f"\nOrganizations:")
-    print(f"  ✓ Successfully geocoded: {org_success}")
-    print(f"  ✗ Failed: {org_failed}")
-    print(f"\nTotal: {fb_success + org_success} locations geocoded")
+    # Same as `python manage.py geocode`; an interrupted run picks up where it stopped
+    call_command('geocode')
     
     input("\nPress Enter to continue...")
 
@@ -454,7 +406,7 @@ def set_all_locations_public():
     fb_updated = 0
     for fb in foodbanks:
         fb.is_public = True
-        fb.save()
+        fb.save(update_fields=['is_public'])
         fb_updated += 1
         print(f"✓ {fb.name} set to public")
     
@@ -462,7 +414,7 @@ def set_all_locations_public():
     org_updated = 0
     for org in orgs:
         org.is_public = True
-        org.save()
+        org.save(update_fields=['is_public'])
         org_updated += 1
         print(f"✓ {org.name} set to public")
     
@@ -0,0 +1,70 @@
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Accepted column names, e.g. the Census Bureau's ZCTA Gazetteer file
+# (GEOID, INTPTLAT, INTPTLONG) or a plain zipcode,latitude,longitude CSV
+ZIPCODE_COLUMNS = ('zipcode', 'zip', 'geoid')
+LATITUDE_COLUMNS = ('latitude', 'lat', 'intptlat')
+LONGITUDE_COLUMNS = ('longitude', 'lng', 'lon', 'intptlong')
+
+
+def find_column(header, names):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    raise CommandError(f"No {names[0]} column (tried: {', '.join(names)})")
+
+
+class Command(BaseCommand):
+    help = "Build the ZIP centroid dataset used by the offline 'zip' geocoder from a Census ZCTA Gazetteer file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Gazetteer .txt (tab separated) or CSV with ZIP codes and coordinates")
+        parser.add_argument('--output', default=settings.ZIP_CENTROIDS_PATH, help="Where to write the dataset")
+
+    def handle(self, *args, **options):
+        try:
+            source = open(options['source'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f"Can't read {options['source']}: {e}")
+
+        with source:
+            first_line = source.readline()
+            delimiter = '\t' if '\t' in first_line else ','
+            header = [name.strip().lower() for name in next(csv.reader([first_line], delimiter=delimiter))]
+            zip_col = find_column(header, ZIPCODE_COLUMNS)
+            lat_col = find_column(header, LATITUDE_COLUMNS)
+            lng_col = find_column(header, LONGITUDE_COLUMNS)
+
+            centroids = {}
+            skipped = 0
+            for row in csv.reader(source, delimiter=delimiter):
+                try:
+                    zipcode = row[zip_col].strip().zfill(5)
+                    lat, lng = float(row[lat_col]), float(row[lng_col])
+                except (IndexError, ValueError):
+                    skipped += 1
+                    continue
+                if len(zipcode) != 5 or not zipcode.isdigit():
+                    skipped += 1
+                    continue
+                centroids[zipcode] = (round(lat, 6), round(lng, 6))
+
+        # Don't replace a working dataset with an empty one
+        if not centroids:
+            raise CommandError(f"No ZIP centroids found in {options['source']} ({skipped} rows skipped); nothing written")
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['zipcode', 'latitude', 'longitude'])
+            for zipcode in sorted(centroids):
+                writer.writerow([zipcode, *centroids[zipcode]])
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} rows without a valid ZIP code and coordinates"))
+        self.stdout.write(self.style.SUCCESS(f"✓ Wrote {len(centroids)} ZIP centroids to {output}"))
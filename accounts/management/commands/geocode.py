@@ -0,0 +1,127 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.geocode_queue import wait_for_request_slot
+from accounts.models import Foodbank, FoodbankOrganization, GeocodeJob
+from foodbanked.geocoding import GEOCODERS, GeocodingError, format_address, get_geocoder
+
+# Organizations first, in primary key order, so a checkpoint is just the last pk done of each
+TARGETS = (
+    ('organization', FoodbankOrganization),
+    ('foodbank', Foodbank),
+)
+
+
+class Command(BaseCommand):
+    help = "Geocode every foodbank and organization missing coordinates, resuming after a crash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-geocode records that already have coordinates")
+        parser.add_argument(
+            '--geocoder',
+            help=f"Comma separated geocoders to try in order, from: {', '.join(sorted(GEOCODERS))} "
+                 "(defaults to settings.GEOCODER)"
+        )
+        parser.add_argument('--batch-size', type=int, default=50, help="Records saved per bulk update and checkpoint")
+        parser.add_argument(
+            '--checkpoint', default=settings.GEOCODE_CHECKPOINT_PATH,
+            help="Progress file; an interrupted run resumes from it (defaults to settings.GEOCODE_CHECKPOINT_PATH)"
+        )
+        parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and start over")
+
+    def handle(self, *args, **options):
+        try:
+            geocoder = get_geocoder(options['geocoder'])
+        except KeyError as e:
+            raise CommandError(f"Unknown geocoder {e}")
+
+        self.checkpoint_path = options['checkpoint']
+        checkpoint = {} if options['restart'] else self.load_checkpoint()
+        if checkpoint:
+            self.stdout.write(f"Resuming from checkpoint: {checkpoint}")
+
+        self.stats = {'geocoded': 0, 'not_found': 0, 'errors': 0, 'requests': 0}
+        self.processed = 0
+        started = time.monotonic()
+
+        def wait(name, interval, burst):
+            self.stats['requests'] += 1
+            wait_for_request_slot(name, interval, burst)
+
+        for target, model in TARGETS:
+            records = model.objects.only('id', 'name', 'address', 'city', 'state', 'zipcode').order_by('pk')
+            if not options['all']:
+                records = records.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
+            if checkpoint.get(target):
+                records = records.filter(pk__gt=checkpoint[target])
+
+            found = []
+            last_pk = None
+            for record in records.iterator():
+                last_pk = record.pk
+                full_address = format_address(record.address, record.city, record.state, record.zipcode)
+                if full_address:
+                    try:
+                        lat, lng = geocoder.geocode(full_address, wait=wait)
+                    except GeocodingError as e:
+                        self.stats['errors'] += 1
+                        self.stdout.write(f"  ✗ {record}: {e}")
+                    else:
+                        if lat is None or lng is None:
+                            self.stats['not_found'] += 1
+                            self.stdout.write(f"  ✗ {record}: Address not found")
+                        else:
+                            self.stats['geocoded'] += 1
+                            record.latitude, record.longitude = round(lat, 6), round(lng, 6)
+                            found.append(record)
+
+                self.processed += 1
+                if self.processed % options['batch_size'] == 0:
+                    self.save_batch(target, model, found, last_pk, checkpoint)
+                    found = []
+            if last_pk is not None:
+                self.save_batch(target, model, found, last_pk, checkpoint)
+
+        # Finished, so the next run starts from the beginning
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        elapsed = time.monotonic() - started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Geocoded {self.stats['geocoded']} of {self.processed} locations in {elapsed:.1f}s "
+            f"({rate:.1f}/s; {self.stats['requests']} remote requests, "
+            f"{self.stats['not_found']} not found, {self.stats['errors']} errors)"
+        ))
+
+    def save_batch(self, target, model, found, last_pk, checkpoint):
+        """Write the coordinates found, retire their queued jobs and record the progress"""
+        # bulk_update() skips save(), so the records aren't queued again
+        model.objects.bulk_update(found, ['latitude', 'longitude'])
+        GeocodeJob.objects.filter(
+            status='pending', **{f'{target}__in': [record.pk for record in found]}
+        ).update(status='done', last_error='')
+
+        checkpoint[target] = last_pk
+        self.save_checkpoint(checkpoint)
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            raise CommandError(f"Checkpoint {self.checkpoint_path} is corrupt; rerun with --restart")
+
+    def save_checkpoint(self, checkpoint):
+        # Written aside and renamed into place, so a crash mid-write can't leave half a file
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.geocode_queue import process_geocode_jobs
+from foodbanked.geocoding import GEOCODERS, get_geocoder
+
+
+class Command(BaseCommand):
+    help = "Geocode queued foodbank and organization addresses (runs until stopped unless --once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument(
+            '--geocoder',
+            help=f"Comma separated geocoders to try in order, from: {', '.join(sorted(GEOCODERS))} "
+                 "(defaults to settings.GEOCODER; 'fake' and 'zip' need no network)"
+        )
+        parser.add_argument('--poll-interval', type=float, default=5, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        try:
+            geocoder = get_geocoder(options['geocoder'])
+        except KeyError as e:
+            raise CommandError(f"Unknown geocoder {e}")
+        succeeded = failed = 0
+
+        while True:
+            for job, ok in process_geocode_jobs(geocoder):
+                record = job.foodbank or job.organization
+                if ok:
+                    succeeded += 1
+                    self.stdout.write(f"  ✓ {record}: {record.latitude}, {record.longitude}")
+                else:
+                    failed += 1
+                    retry = f" (retrying, attempt {job.attempts})" if job.status == 'pending' else ""
+                    self.stdout.write(f"  ✗ {record}: {job.last_error}{retry}")
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Geocoded {succeeded} locations, {failed} failed"))
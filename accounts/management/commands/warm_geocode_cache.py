@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.geocode_cache import build_cache_entry, store_cache_entries
+from accounts.models import Foodbank, FoodbankOrganization
+from foodbanked.geocoding import format_address
+
+
+class Command(BaseCommand):
+    help = "Seed the geocode cache with the coordinates foodbanks and organizations already have"
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        entries = {}
+
+        for model in (FoodbankOrganization, Foodbank):
+            records = model.objects.filter(latitude__isnull=False, longitude__isnull=False).values_list(
+                'address', 'city', 'state', 'zipcode', 'latitude', 'longitude'
+            )
+            for address, city, state, zipcode, lat, lng in records:
+                full_address = format_address(address, city, state, zipcode)
+                if full_address:
+                    entry = build_cache_entry(full_address, float(lat), float(lng), 'import', now)
+                    # Foodbanks come last, so they win when sharing an address with their organization
+                    entries[entry.key] = entry
+
+        store_cache_entries(list(entries.values()))
+        self.stdout.write(self.style.SUCCESS(f"✓ Cached coordinates for {len(entries)} addresses"))
@@ -2,10 +2,60 @@
 # accounts/models.py
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
+# Fields whose change means a record has to be geocoded again
+ADDRESS_FIELDS = {'address', 'city', 'state', 'zipcode'}
 
-class FoodbankOrganization(models.Model):
+
+class FieldChangeTrackingMixin:
+    """
+    Remembers the values a row was loaded with, so save() can tell what
+    changed without reading the row back from the database
+    """
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def snapshot_fields(self, fields=None):
+        """Treat the current values of `fields` (default: every loaded field) as the saved ones"""
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+            fields = [field.name for field in self._meta.concrete_fields]
+        deferred = self.get_deferred_fields()
+        for name in fields:
+            attname = self._meta.get_field(name).attname
+            if attname not in deferred:
+                self._loaded_values[attname] = getattr(self, attname)
+    
+    @property
+    def changed_fields(self):
+        """Names of the fields that differ from the database (every field on an unsaved record)"""
+        if self._state.adding:
+            return {field.name for field in self._meta.concrete_fields if not field.primary_key}
+        
+        loaded = getattr(self, '_loaded_values', {})
+        deferred = self.get_deferred_fields()
+        return {
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in deferred
+            and (field.attname not in loaded or loaded[field.attname] != getattr(self, field.attname))
+        }
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_fields(kwargs.get('update_fields'))
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.snapshot_fields(fields)
+
+
+class FoodbankOrganization(FieldChangeTrackingMixin, models.Model):
     """Parent organization that manages multiple foodbanks"""
     name = models.CharField(max_length=200)  # e.g., "Idaho Foodbank"
     slug = models.SlugField(max_length=200, unique=True, blank=True)
@@ -49,36 +99,29 @@ class FoodbankOrganization(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         
-        # Check if we need to geocode
-        needs_geocoding = False
+        # Geocode new records, records missing coordinates and address changes
+        needs_geocoding = (
+            self._state.adding or
+            not self.latitude or not self.longitude or
+            bool(ADDRESS_FIELDS & self.changed_fields)
+        )
         
-        if not self.pk:
-            # New record - geocode if we have address info
-            needs_geocoding = True
-        elif not self.latitude or not self.longitude:
-            # Missing coordinates - geocode
-            needs_geocoding = True
-        else:
-            # Check if address changed for existing record
-            try:
-                old = FoodbankOrganization.objects.get(pk=self.pk)
-                if (old.address != self.address or 
-                    old.city != self.city or 
-                    old.state != self.state or 
-                    old.zipcode != self.zipcode):
-                    needs_geocoding = True
-            except FoodbankOrganization.DoesNotExist:
-                needs_geocoding = True
+        super().save(*args, **kwargs)
         
+        # Remote geocoding is slow and rate limited, so unless the address is
+        # cached or resolvable offline it's queued for the geocode_worker command
         if needs_geocoding:
-            self.geocode()
-        
-        super().save(*args, **kwargs)
+            from accounts.geocode_queue import geocode_or_enqueue
+            geocode_or_enqueue(self)
     
     def geocode(self):
-        """Geocode this organization's address"""
-        from foodbanked.geocoding import geocode_address
-        lat, lng = geocode_address(self.address, self.city, self.state, self.zipcode)
+        """Geocode this organization's address right away (rate limited; save() queues it instead)"""
+        from accounts.geocode_queue import geocode_record
+        from foodbanked.geocoding import GeocodingError
+        try:
+            lat, lng = geocode_record(self)
+        except GeocodingError:
+            return
         if lat and lng:
             self.latitude = lat
             self.longitude = lng
@@ -87,7 +130,7 @@ class FoodbankOrganization(models.Model):
         return self.name
 
 
-class Foodbank(models.Model):
+class Foodbank(FieldChangeTrackingMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     organization = models.ForeignKey(
         FoodbankOrganization, 
@@ -136,36 +179,29 @@ class Foodbank(models.Model):
     )
     
     def save(self, *args, **kwargs):
-        # Check if we need to geocode
-        needs_geocoding = False
+        # Geocode new records, records missing coordinates and address changes
+        needs_geocoding = (
+            self._state.adding or
+            not self.latitude or not self.longitude or
+            bool(ADDRESS_FIELDS & self.changed_fields)
+        )
         
-        if not self.pk:
-            # New record - geocode if we have address info
-            needs_geocoding = True
-        elif not self.latitude or not self.longitude:
-            # Missing coordinates - geocode
-            needs_geocoding = True
-        else:
-            # Check if address changed for existing record
-            try:
-                old = Foodbank.objects.get(pk=self.pk)
-                if (old.address != self.address or 
-                    old.city != self.city or 
-                    old.state != self.state or 
-                    old.zipcode != self.zipcode):
-                    needs_geocoding = True
-            except Foodbank.DoesNotExist:
-                needs_geocoding = True
+        super().save(*args, **kwargs)
         
+        # Remote geocoding is slow and rate limited, so unless the address is
+        # cached or resolvable offline it's queued for the geocode_worker command
         if needs_geocoding:
-            self.geocode()
-        
-        super().save(*args, **kwargs)
+            from accounts.geocode_queue import geocode_or_enqueue
+            geocode_or_enqueue(self)
     
     def geocode(self):
-        """Geocode this foodbank's address"""
-        from foodbanked.geocoding import geocode_address
-        lat, lng = geocode_address(self.address, self.city, self.state, self.zipcode)
+        """Geocode this foodbank's address right away (rate limited; save() queues it instead)"""
+        from accounts.geocode_queue import geocode_record
+        from foodbanked.geocoding import GeocodingError
+        try:
+            lat, lng = geocode_record(self)
+        except GeocodingError:
+            return
         if lat and lng:
             self.latitude = lat
             self.longitude = lng
@@ -265,4 +301,69 @@ class ServiceZipcode(models.Model):
         ordering = ['zipcode']
     
     def __str__(self):
-        return f"{self.zipcode} - {self.city}, {self.state}"
\ No newline at end of file
+        return f"{self.zipcode} - {self.city}, {self.state}"
+
+
+class GeocodeJob(models.Model):
+    """Queued geocoding of a foodbank's or organization's address (run by geocode_worker)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    foodbank = models.ForeignKey(
+        Foodbank, on_delete=models.CASCADE, null=True, blank=True, related_name='geocode_jobs'
+    )
+    organization = models.ForeignKey(
+        FoodbankOrganization, on_delete=models.CASCADE, null=True, blank=True, related_name='geocode_jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Geocode {self.foodbank or self.organization} ({self.status})"
+    
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+
+class GeocodeThrottle(models.Model):
+    """When a geocoding service may next be called; shared by every worker process"""
+    name = models.CharField(max_length=50, unique=True)
+    next_request_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.name}: next request at {self.next_request_at}"
+
+
+class GeocodeCacheEntry(models.Model):
+    """Remembered geocoding result for a normalized address (see accounts.geocode_cache)"""
+    # SHA-1 of the normalized address; addresses can be too long to index directly
+    key = models.CharField(max_length=40, unique=True)
+    normalized_address = models.TextField()
+    
+    # Null coordinates cache a "not found" answer
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    
+    source = models.CharField(max_length=50)  # Geocoder name, or "import" for warmed entries
+    expires_at = models.DateTimeField()
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    @property
+    def found(self):
+        return self.latitude is not None and self.longitude is not None
+    
+    def __str__(self):
+        result = f"{self.latitude}, {self.longitude}" if self.found else "not found"
+        return f"{self.normalized_address}: {result}"
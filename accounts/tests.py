@@ -1,3 +1,104 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from foodbanked.geocoding import FakeGeocoder, GeocoderChain
+from .geocode_queue import MAX_ATTEMPTS, enqueue_geocode, process_geocode_jobs
+from .models import Foodbank, GeocodeJob
+
+
+class FakeClock:
+    """Stands in for timezone.now() and time.sleep() in accounts.geocode_queue"""
+
+    def __init__(self):
+        self.current = timezone.now()
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+class ThrottledFakeGeocoder(FakeGeocoder):
+    """The fake geocoder with a rate limit like Nominatim's, logging when it's called"""
+    name = 'fake-throttled'
+    min_interval = 1.0
+    offline = False
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def geocode(self, full_address):
+        self.calls.append(self.clock.now())
+        return super().geocode(full_address)
+
+
+@override_settings(GEOCODER='fake')
+class GeocodeWorkerTests(TestCase):
+    def queue_foodbank(self, name, address):
+        # Saved without an address, which the fake geocoder would resolve (or fail on) right away
+        foodbank = Foodbank.objects.create(user=User.objects.create_user(name), name=name)
+        Foodbank.objects.filter(pk=foodbank.pk).update(address=address, city='Moscow', state='ID', zipcode='83843')
+        foodbank.refresh_from_db()
+        return foodbank, enqueue_geocode(foodbank)
+
+    def run_worker(self):
+        out = StringIO()
+        call_command('geocode_worker', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_worker_completes_jobs_and_fails_unknown_addresses(self):
+        found, found_job = self.queue_foodbank('found', '123 Main St')
+        missing, missing_job = self.queue_foodbank('missing', '1 Nowhere Rd')
+
+        output = self.run_worker()
+        self.assertIn('Geocoded 1 locations, 1 failed', output)
+
+        found_job.refresh_from_db()
+        found.refresh_from_db()
+        self.assertEqual(found_job.status, 'done')
+        self.assertIsNotNone(found.latitude)
+
+        missing_job.refresh_from_db()
+        self.assertEqual(missing_job.status, 'failed')
+        self.assertEqual(missing_job.last_error, 'Address not found')
+
+    def test_outages_are_retried_then_marked_failed(self):
+        foodbank, job = self.queue_foodbank('outage', '9 Unavailable Ave')
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.run_worker()
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertEqual(job.last_error, 'Fake geocoder outage')
+            if attempt < MAX_ATTEMPTS:
+                self.assertEqual(job.status, 'pending')
+                self.assertGreater(job.run_after, timezone.now())
+                # Not due yet: the worker leaves it alone
+                self.run_worker()
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                GeocodeJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(job.status, 'failed')
+
+    def test_rate_limit_spaces_requests(self):
+        for i in range(3):
+            self.queue_foodbank(f'throttled-{i}', f'{i} Main St')
+        clock = FakeClock()
+        geocoder = ThrottledFakeGeocoder(clock)
+
+        with mock.patch('accounts.geocode_queue.timezone', clock), mock.patch('accounts.geocode_queue.time', clock):
+            results = list(process_geocode_jobs(GeocoderChain([geocoder])))
+
+        self.assertEqual([ok for job, ok in results], [True, True, True])
+        gaps = [later - earlier for earlier, later in zip(geocoder.calls, geocoder.calls[1:])]
+        self.assertEqual(len(gaps), 2)
+        for gap in gaps:
+            self.assertGreaterEqual(gap, timedelta(seconds=geocoder.min_interval))
@@ -24,10 +24,12 @@ urlpatterns = [
 
     # Foodbank Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
 
     # Organization Admin URLs
     path('<slug:org_slug>/', views.organization_dashboard, name='organization_dashboard'),
     path('<slug:org_slug>/analytics/', views.organization_analytics, name='organization_analytics'),
     path('<slug:org_slug>/settings/', views.organization_settings, name='organization_settings'),
+    path('<slug:org_slug>/export/visits/', views.organization_visit_export, name='organization_visit_export'),
 
 ]
\ No newline at end of file
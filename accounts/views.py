@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
 from django.contrib import messages
 from django.utils import timezone
 from datetime import timedelta
@@ -66,36 +68,15 @@ def dashboard(request):
 @foodbank_required
 def foodbank_dashboard(request):
     """Dashboard for individual foodbanks"""
-    # Import Visit and Patron models
-    from visits.models import Visit, Patron
+    # Import Visit model and the cached statistics
+    from visits.models import Visit
+    from visits.stats import cached_dashboard_statistics
     
     # Get the foodbank
     foodbank = request.user.foodbank
     
-    # Calculate date ranges
-    today = get_foodbank_today(foodbank)
-    week_start = today - timedelta(days=today.weekday())  # Monday of this week
-    month_start = today.replace(day=1)
-    
-    # Get statistics
-    visits_today = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date=today
-    ).count()
-    
-    visits_this_week = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=week_start
-    ).count()
-    
-    visits_this_month = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).count()
-    
-    total_patrons = Patron.objects.filter(
-        foodbank=foodbank
-    ).count()
+    # Get statistics (cached per foodbank and day, dropped whenever visits or patrons change)
+    stats = cached_dashboard_statistics(foodbank)
     
     # Get recent visits (last 5)
     recent_visits = Visit.objects.filter(
@@ -104,10 +85,10 @@ def foodbank_dashboard(request):
     
     context = {
         'foodbank': foodbank,
-        'visits_today': visits_today,
-        'visits_this_week': visits_this_week,
-        'visits_this_month': visits_this_month,
-        'total_patrons': total_patrons,
+        'visits_today': stats['visits_today'],
+        'visits_this_week': stats['visits_this_week'],
+        'visits_this_month': stats['visits_this_month'],
+        'total_patrons': stats['total_patrons'],
         'recent_visits': recent_visits,
     }
     
@@ -119,6 +100,7 @@ def foodbank_dashboard(request):
 def organization_dashboard(request, org_slug):
     """Dashboard for organization admins"""
     from visits.models import Visit, Patron
+    from visits.stats import organization_visit_counts
     
     # Get the organization admin and their organization
     # org_admin = request.user.organizationadmin
@@ -133,32 +115,9 @@ def organization_dashboard(request, org_slug):
     # Get all member foodbanks
     foodbanks = organization.foodbanks.all()
     
-    # Calculate date ranges (using first foodbank's timezone, or default)
-    first_foodbank = foodbanks.first()
-    if first_foodbank:
-        today = get_foodbank_today(first_foodbank)
-    else:
-        from django.utils import timezone as django_tz
-        today = django_tz.now().date()
-    
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-    
-    # Aggregate statistics across all member foodbanks
-    total_visits_today = Visit.objects.filter(
-        foodbank__organization=organization,
-        visit_date=today
-    ).count()
-    
-    total_visits_week = Visit.objects.filter(
-        foodbank__organization=organization,
-        visit_date__gte=week_start
-    ).count()
-    
-    total_visits_month = Visit.objects.filter(
-        foodbank__organization=organization,
-        visit_date__gte=month_start
-    ).count()
+    # Visit counts for every member foodbank, by each foodbank's local date
+    # (one grouped query per timezone the members are in)
+    visit_counts = organization_visit_counts(foodbanks)
     
     total_patrons = Patron.objects.filter(
         foodbank__organization=organization
@@ -172,14 +131,18 @@ def organization_dashboard(request, org_slug):
     # Statistics by foodbank
     foodbank_stats = []
     for fb in foodbanks:
-        visits_today = Visit.objects.filter(foodbank=fb, visit_date=today).count()
-        visits_month = Visit.objects.filter(foodbank=fb, visit_date__gte=month_start).count()
+        counts = visit_counts.get(fb.id, {})
         foodbank_stats.append({
             'foodbank': fb,
-            'visits_today': visits_today,
-            'visits_month': visits_month,
+            'visits_today': counts.get('visits_today', 0),
+            'visits_month': counts.get('visits_month', 0),
         })
     
+    # Aggregate statistics across all member foodbanks
+    total_visits_today = sum(counts['visits_today'] for counts in visit_counts.values())
+    total_visits_week = sum(counts['visits_week'] for counts in visit_counts.values())
+    total_visits_month = sum(counts['visits_month'] for counts in visit_counts.values())
+    
     context = {
         'organization': organization,
         'foodbanks': foodbanks,
@@ -311,7 +274,7 @@ def toggle_food_truck(request):
         enabled = data.get('enabled', False)
         
         foodbank.food_truck_enabled = enabled
-        foodbank.save()
+        foodbank.save(update_fields=['food_truck_enabled'])
         
         return JsonResponse({
             'success': True,
@@ -336,7 +299,7 @@ def toggle_by_name(request):
         
         foodbank = request.user.foodbank
         foodbank.allow_by_name = enabled
-        foodbank.save()
+        foodbank.save(update_fields=['allow_by_name'])
         
         return JsonResponse({'success': True, 'enabled': enabled})
     except Exception as e:
@@ -353,20 +316,33 @@ def toggle_anonymous(request):
         
         foodbank = request.user.foodbank
         foodbank.allow_anonymous = enabled
-        foodbank.save()
+        foodbank.save(update_fields=['allow_anonymous'])
         
         return JsonResponse({'success': True, 'enabled': enabled})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
 
+@staff_member_required
+def dashboard_cache_stats(request):
+    """Hit/miss counters for the dashboard statistics cache (site admins only)"""
+    from visits.stats import dashboard_cache_counters
+    
+    return JsonResponse({
+        'backend': settings.CACHES['default']['BACKEND'],
+        'timeout': settings.DASHBOARD_STATS_CACHE_TIMEOUT,
+        **dashboard_cache_counters(),
+    })
+
+
 # Add this to your accounts/views.py file
 
 @login_required
 @organization_required
 def organization_analytics(request, org_slug):
     """Analytics page for organization admins"""
-    from visits.models import Visit, Patron
+    from visits.models import Patron
+    from visits.stats import organization_visit_counts
     from datetime import timedelta
     
     # Get the organization by slug
@@ -380,16 +356,6 @@ def organization_analytics(request, org_slug):
     # Get all member foodbanks
     foodbanks = organization.foodbanks.all()
     
-    # Calculate date ranges
-    first_foodbank = foodbanks.first()
-    if first_foodbank:
-        today = get_foodbank_today(first_foodbank)
-    else:
-        from django.utils import timezone as django_tz
-        today = django_tz.now().date()
-    
-    month_start = today.replace(day=1)
-    
     # Aggregate statistics
     total_foodbanks = foodbanks.count()
     
@@ -397,24 +363,18 @@ def organization_analytics(request, org_slug):
         foodbank__organization=organization
     ).count()
     
-    total_visits_month = Visit.objects.filter(
-        foodbank__organization=organization,
-        visit_date__gte=month_start
-    ).count()
-    
-    total_visits_all_time = Visit.objects.filter(
-        foodbank__organization=organization
-    ).count()
+    # Visit counts for every member foodbank, by each foodbank's local date
+    # (one grouped query per timezone the members are in)
+    visit_counts = organization_visit_counts(foodbanks, all_time=True)
     
     # Statistics by foodbank
     foodbank_stats = []
     for fb in foodbanks:
-        visits_month = Visit.objects.filter(foodbank=fb, visit_date__gte=month_start).count()
-        total_visits = Visit.objects.filter(foodbank=fb).count()
+        counts = visit_counts.get(fb.id, {})
         foodbank_stats.append({
             'foodbank': fb,
-            'visits_month': visits_month,
-            'total_visits': total_visits,
+            'visits_month': counts.get('visits_month', 0),
+            'total_visits': counts.get('total_visits', 0),
         })
     
     # Sort by most visits this month
@@ -424,10 +384,26 @@ def organization_analytics(request, org_slug):
         'organization': organization,
         'total_foodbanks': total_foodbanks,
         'total_patrons': total_patrons,
-        'total_visits_month': total_visits_month,
-        'total_visits_all_time': total_visits_all_time,
+        'total_visits_month': sum(counts['visits_month'] for counts in visit_counts.values()),
+        'total_visits_all_time': sum(counts['total_visits'] for counts in visit_counts.values()),
         'foodbank_stats': foodbank_stats,
     }
     
     return render(request, 'accounts/organization_analytics.html', context)
-    
\ No newline at end of file
+
+
+@login_required
+@organization_required
+def organization_visit_export(request, org_slug):
+    """Download the visits of every member foodbank as CSV or XLSX"""
+    from visits.export import export_download
+    
+    organization = get_object_or_404(FoodbankOrganization, slug=org_slug)
+    
+    # Verify the user has access to this organization
+    if not hasattr(request.user, 'organizationadmin') or request.user.organizationadmin.organization != organization:
+        messages.error(request, 'You do not have access to this organization.')
+        return redirect('accounts:login')
+    
+    foodbank_ids = organization.foodbanks.values_list('pk', flat=True)
+    return export_download(request, foodbank_ids, organization.name)
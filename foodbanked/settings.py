@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -147,6 +148,63 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Maintain the trigram table so patron typeahead also matches inside words
+# (e.g. "mit" finds "Smith"); prefix matching works either way
+PATRON_SEARCH_TRIGRAMS = True
+
+# Cache backend: "locmem" (default), "file" or "db". Local memory is per process,
+# so with several web workers one worker's invalidations don't reach the others;
+# use the file or database cache there (run `manage.py createcachetable` for "db").
+# The file cache lives in CACHE_LOCATION, by default in the system temp directory
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(Path(tempfile.gettempdir()) / 'foodbanked_cache')),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'foodbanked_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodbanked',
+        }
+    }
+
+# Seconds the dashboard statistics stay cached; visit and patron changes drop them sooner
+DASHBOARD_STATS_CACHE_TIMEOUT = 300
+
+# Where build_food_catalog writes the catalog bundles the shelf-life page can
+# download and search offline, and whether the page uses them
+FOOD_CATALOG_DIR = config('FOOD_CATALOG_DIR', default=str(BASE_DIR / 'food_catalog'))
+FOOD_CATALOG_CLIENT_SEARCH = config('FOOD_CATALOG_CLIENT_SEARCH', default=True, cast=bool)
+
+# Geocoders tried in order for foodbank/organization addresses, after the geocode
+# cache: "zip" (offline ZIP code centroids), "nominatim", or "fake" to run offline
+GEOCODER = config('GEOCODER', default='zip,nominatim')
+
+# zipcode,latitude,longitude CSV used by the "zip" geocoder (see build_zip_centroids)
+ZIP_CENTROIDS_PATH = config('ZIP_CENTROIDS_PATH', default=str(BASE_DIR / 'foodbanked' / 'data' / 'zip_centroids.csv'))
+
+# Progress file of the geocode command, so an interrupted run resumes; kept out
+# of the source tree
+GEOCODE_CHECKPOINT_PATH = config(
+    'GEOCODE_CHECKPOINT_PATH', default=str(Path(tempfile.gettempdir()) / 'foodbanked_geocode_checkpoint.json')
+)
+
+# Days a geocoding result is reused before the address is looked up again.
+# "Not found" answers expire sooner in case the service's data improves.
+GEOCODE_CACHE_TTL_DAYS = 365
+GEOCODE_CACHE_FAILURE_TTL_DAYS = 7
+
 # Redirect after login
 LOGIN_REDIRECT_URL = '/accounts/dashboard/'
 
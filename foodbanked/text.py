@@ -0,0 +1,17 @@
+# foodbanked/text.py
+import re
+import unicodedata
+
+# Longest token kept; longer ones are cut (patron search tokens are stored in a 100-character column)
+MAX_TOKEN_LENGTH = 100
+
+
+def normalize_tokens(value):
+    """Lowercase, accent-fold and split a string into alphanumeric tokens"""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return [t[:MAX_TOKEN_LENGTH] for t in re.split(r'[^a-z0-9]+', value.lower()) if t]
+
+
+def digits_only(value):
+    return re.sub(r'\D', '', str(value or ''))
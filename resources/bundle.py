@@ -0,0 +1,141 @@
+# resources/bundle.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .catalog import catalog_version
+from .models import FoodItem
+from .search import SYNONYM_GROUPS
+
+# Order of the values in each item row of the bundle
+BUNDLE_FIELDS = (
+    'id', 'name', 'category', 'subcategory', 'shelf_life_display',
+    'shelf_life_min_days', 'shelf_life_max_days', 'notes',
+)
+
+# Hex digits of the content hash in a bundle's file name
+DIGEST_LENGTH = 16
+BUNDLE_NAME_RE = re.compile(rf'^catalog\.([0-9a-f]{{{DIGEST_LENGTH}}})\.json$')
+
+# Encodings a bundle is stored in besides plain JSON, best first, as file suffixes
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def catalog_directory():
+    return Path(settings.FOOD_CATALOG_DIR)
+
+
+def bundle_path(digest, suffix=''):
+    return catalog_directory() / f'catalog.{digest}.json{suffix}'
+
+
+def brotli_supported():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def catalog_payload():
+    """
+    The whole catalog as compact JSON bytes: the categories in display order,
+    the search synonyms, and a row of BUNDLE_FIELDS per item. Rows are sorted
+    by id so the same catalog always encodes to the same bytes (and hash).
+    """
+    items = FoodItem.objects.order_by('id').values_list(*BUNDLE_FIELDS)
+    payload = {
+        'fields': BUNDLE_FIELDS,
+        'categories': FoodItem.CATEGORY_CHOICES,
+        'synonyms': SYNONYM_GROUPS,
+        'items': [list(item) for item in items],
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_atomically(path, content):
+    """Write to a temporary file beside `path` and rename it, so readers never see half a file"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def build_catalog_bundle():
+    """
+    Write the current catalog to catalog.<content hash>.json in
+    settings.FOOD_CATALOG_DIR, with gzip (and, if the brotli package is
+    installed, brotli) copies beside it. Returns the hash; a bundle already
+    written for the same content is left alone.
+    """
+    content = catalog_payload()
+    digest = hashlib.sha256(content).hexdigest()[:DIGEST_LENGTH]
+
+    catalog_directory().mkdir(parents=True, exist_ok=True)
+    if not bundle_path(digest, '.gz').exists():
+        # mtime=0 keeps the gzip bytes the same from build to build
+        write_atomically(bundle_path(digest, '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli_supported() and not bundle_path(digest, '.br').exists():
+        import brotli
+        write_atomically(bundle_path(digest, '.br'), brotli.compress(content, quality=11))
+    # The plain file last: its presence means the bundle is complete
+    if not bundle_path(digest).exists():
+        write_atomically(bundle_path(digest), content)
+    return digest
+
+
+def bundle_digests():
+    """Hashes of the complete bundles in the catalog directory"""
+    if not catalog_directory().is_dir():
+        return []
+    return [match.group(1) for match in map(BUNDLE_NAME_RE.match, os.listdir(catalog_directory())) if match]
+
+
+def prune_catalog_bundles(keep):
+    """Delete every bundle but the ones hashed in `keep`. Returns the number deleted."""
+    deleted = 0
+    for digest in bundle_digests():
+        if digest in keep:
+            continue
+        for suffix in [suffix for encoding, suffix in ENCODING_SUFFIXES] + ['']:
+            try:
+                bundle_path(digest, suffix).unlink()
+            except FileNotFoundError:
+                pass
+        deleted += 1
+    return deleted
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current_catalog_digest():
+    """
+    Hash of the bundle for the catalog as it is now. The bundle is built the
+    first time it's asked for after each catalog version, so the page always
+    links to up-to-date data without a deploy step. The version is read from
+    the database, so an import or an edit made by any process is noticed.
+    """
+    global _current
+    version = catalog_version()
+    current = _current
+    if current is not None and current[0] == version and bundle_path(current[1]).exists():
+        return current[1]
+
+    with _current_lock:
+        if _current is None or _current[0] != version or not bundle_path(_current[1]).exists():
+            _current = (version, build_catalog_bundle())
+        return _current[1]
@@ -0,0 +1,56 @@
+# resources/catalog.py
+import time
+from datetime import datetime, timezone
+
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Greatest
+
+from .models import CatalogVersion
+
+# Primary key of the CatalogVersion row
+CATALOG_VERSION_ID = 1
+
+
+def new_catalog_version():
+    """Microseconds since the epoch, so a version also says when the catalog last changed"""
+    return time.time_ns() // 1000
+
+
+def catalog_version():
+    """
+    Stamp that changes whenever a FoodItem is written. It's read from the
+    database, so an edit in one worker or an import from the command line is
+    seen by every process as soon as it commits.
+    """
+    version = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_catalog_version():
+    """
+    Start a new catalog version. Call it in the transaction that writes the
+    catalog, so the stamp changes exactly when the change commits. The new
+    version is never below the old one, even if clocks disagree.
+    """
+    bumped = CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(
+        version=Greatest(F('version') + 1, Value(new_catalog_version(), output_field=BigIntegerField()))
+    )
+    if not bumped:
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ID, defaults={'version': new_catalog_version()})
+
+
+def request_catalog_version(request):
+    """The catalog version, read once per request"""
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = catalog_version()
+    return request._catalog_version
+
+
+def catalog_etag(request, *args, **kwargs):
+    """ETag for views whose response depends only on the catalog and the URL (see @condition)"""
+    return f'catalog-{request_catalog_version(request)}'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    """When the catalog last changed, for the Last-Modified of the same views"""
+    return datetime.fromtimestamp(request_catalog_version(request) / 1000000, tz=timezone.utc)
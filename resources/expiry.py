@@ -0,0 +1,117 @@
+# resources/expiry.py
+import json
+from datetime import date
+
+from .search import food_search_index
+
+# Largest manifest accepted in one request
+MAX_EVALUATION_LINES = 10000
+
+# Shelf lives this long mean "indefinitely" (the catalog stores 99999)
+INDEFINITE_DAYS = 10000
+
+KEEP, INSPECT, DISCARD = 'keep', 'inspect', 'discard'
+
+
+class ExpiryRequestError(Exception):
+    """The manifest couldn't be read at all (bad JSON, too many lines)"""
+
+
+def parse_expiry_request(content):
+    """
+    Read a manifest of {"item_id", "best_by"} lines from JSON: a list, or
+    {"items": [...], "as_of": "YYYY-MM-DD"}. Returns (lines, as_of or None).
+    """
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        raise ExpiryRequestError(f"Invalid JSON: {e}")
+
+    as_of = None
+    if isinstance(data, dict):
+        if data.get('as_of'):
+            try:
+                as_of = date.fromisoformat(str(data['as_of']))
+            except ValueError:
+                raise ExpiryRequestError('as_of must be YYYY-MM-DD')
+        data = data.get('items')
+    if not isinstance(data, list) or not all(isinstance(line, dict) for line in data):
+        raise ExpiryRequestError('Expected a list of items')
+    if len(data) > MAX_EVALUATION_LINES:
+        raise ExpiryRequestError(f"At most {MAX_EVALUATION_LINES} items per request")
+    return data, as_of
+
+
+def evaluate_expiry(lines, as_of):
+    """
+    Decide for each manifest line whether the item is still good on `as_of`,
+    judged from its best-by date and the item's shelf life range:
+
+    - keep: up to min days past the best-by date (or no later than it)
+    - inspect: between min and max days past it, or past the best-by date of
+      an item whose shelf life isn't a number of days ("Expiration date on
+      package", "Inspect for freshness"), which a person has to judge
+    - discard: more than max days past it
+
+    latest_safe_date is the best-by date plus max days (the best-by date
+    itself for items without numeric days, none for indefinite ones).
+    Unknown items and unreadable dates get an 'error' instead of a decision.
+
+    The ranges come from the in-memory catalog index, and dates are compared
+    as day ordinals, so no query is made and a line costs a few dict lookups.
+    """
+    shelf_lives = food_search_index().shelf_lives
+    today = as_of.toordinal()
+    parsed_dates, iso_dates = {}, {}
+
+    def best_by_ordinal(value):
+        if not isinstance(value, str):
+            return None
+        if value not in parsed_dates:
+            try:
+                parsed_dates[value] = date.fromisoformat(value).toordinal()
+            except ValueError:
+                parsed_dates[value] = None
+        return parsed_dates[value]
+
+    def iso(ordinal):
+        if ordinal not in iso_dates:
+            iso_dates[ordinal] = date.fromordinal(min(ordinal, date.max.toordinal())).isoformat()
+        return iso_dates[ordinal]
+
+    results = []
+    for line in lines:
+        item_id, best_by = line.get('item_id'), line.get('best_by')
+        result = {'item_id': item_id, 'best_by': best_by}
+        results.append(result)
+
+        try:
+            shelf_life = shelf_lives.get(int(item_id))
+        except (TypeError, ValueError):
+            shelf_life = None
+        if shelf_life is None:
+            result['error'] = 'No such food item'
+            continue
+        best_by_day = best_by_ordinal(best_by)
+        if best_by_day is None:
+            result['error'] = 'best_by must be YYYY-MM-DD'
+            continue
+
+        name, min_days, max_days = shelf_life
+        result['name'] = name
+        if min_days is None or max_days is None:
+            result['decision'] = KEEP if today <= best_by_day else INSPECT
+            result['latest_safe_date'] = iso(best_by_day)
+        elif max_days >= INDEFINITE_DAYS:
+            result['decision'] = KEEP
+            result['latest_safe_date'] = None
+        else:
+            latest_safe_day = best_by_day + max_days
+            if today <= best_by_day + min_days:
+                result['decision'] = KEEP
+            elif today <= latest_safe_day:
+                result['decision'] = INSPECT
+            else:
+                result['decision'] = DISCARD
+            result['latest_safe_date'] = iso(latest_safe_day)
+    return results
@@ -0,0 +1,145 @@
+# resources/importer.py
+import csv
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .catalog import bump_catalog_version
+from .models import FoodItem
+
+# Columns of food_items_export.csv (see manage_resources.export_to_csv)
+CSV_COLUMNS = (
+    'name', 'category', 'subcategory', 'shelf_life_display',
+    'shelf_life_min_days', 'shelf_life_max_days', 'notes',
+)
+
+# Fields an import overwrites on an existing item
+UPDATE_FIELDS = ('subcategory', 'shelf_life_display', 'shelf_life_min_days', 'shelf_life_max_days', 'notes')
+
+
+class FoodItemImportError(Exception):
+    """The file couldn't be read as a food item CSV at all"""
+
+
+def item_key(name, category):
+    """
+    An item's natural key as the database compares it (MySQL's collation
+    ignores case and trailing spaces)
+    """
+    return (name.rstrip().lower(), category)
+
+
+def read_food_item_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise FoodItemImportError(f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+        return list(reader)
+
+
+def parse_days(value):
+    value = (value or '').strip()
+    return int(value) if value else None
+
+
+def validate_food_items(rows):
+    """
+    Check every row before anything is written. Returns (items, errors):
+    unsaved FoodItems, and a list of "Row n: ..." messages numbered by file
+    line (the header is line 1).
+    """
+    items, errors, seen = [], [], {}
+    for line, row in enumerate(rows, start=2):
+        try:
+            item = FoodItem(
+                name=(row['name'] or '').strip(),
+                category=(row['category'] or '').strip(),
+                subcategory=(row['subcategory'] or '').strip(),
+                shelf_life_display=(row['shelf_life_display'] or '').strip(),
+                shelf_life_min_days=parse_days(row['shelf_life_min_days']),
+                shelf_life_max_days=parse_days(row['shelf_life_max_days']),
+                notes=(row['notes'] or '').strip(),
+            )
+        except ValueError:
+            errors.append(f"Row {line} ({(row['name'] or '').strip() or 'no name'}): shelf life days must be whole numbers")
+            continue
+
+        problems = []
+        try:
+            item.full_clean(validate_unique=False)
+        except ValidationError as e:
+            problems += [f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()]
+
+        low, high = item.shelf_life_min_days, item.shelf_life_max_days
+        if (low is None) != (high is None):
+            problems.append("give both shelf life min and max days, or neither")
+        elif low is not None and not 0 <= low <= high:
+            problems.append("shelf life days must satisfy 0 <= min <= max")
+
+        key = item_key(item.name, item.category)
+        if key in seen:
+            problems.append(f"duplicates row {seen[key]}")
+        seen.setdefault(key, line)
+
+        if problems:
+            errors.append(f"Row {line} ({item.name or 'no name'}): {'; '.join(problems)}")
+        else:
+            items.append(item)
+    return items, errors
+
+
+def diff_food_items(items):
+    """
+    Compare validated items with the catalog. Returns a dict of 'inserted'
+    (new items), 'updated' ([(item, {field: (old, new)})]), 'unchanged' (a count)
+    and 'missing' (catalog items the file doesn't mention).
+    """
+    existing = {item_key(item.name, item.category): item for item in FoodItem.objects.all()}
+
+    plan = {'inserted': [], 'updated': [], 'unchanged': 0, 'missing': []}
+    for item in items:
+        current = existing.pop(item_key(item.name, item.category), None)
+        if current is None:
+            plan['inserted'].append(item)
+            continue
+
+        # Match the stored spelling so the upsert hits the same row on every backend
+        item.name = current.name
+        changes = {
+            field: (getattr(current, field), getattr(item, field))
+            for field in UPDATE_FIELDS
+            if getattr(current, field) != getattr(item, field)
+        }
+        if changes:
+            plan['updated'].append((item, changes))
+        else:
+            plan['unchanged'] += 1
+
+    plan['missing'] = sorted(existing.values(), key=lambda item: (item.category, item.name))
+    return plan
+
+
+def apply_food_item_import(plan, prune=False):
+    """
+    Write an import plan in one transaction: new and changed items in a
+    single upsert on (name, category), and with `prune`, delete the missing
+    ones. The catalog is never empty mid-import, unlike clearing it first.
+    """
+    items = plan['inserted'] + [item for item, changes in plan['updated']]
+    # MySQL's ON DUPLICATE KEY UPDATE can't name the conflicting unique key
+    unique_fields = ('name', 'category') if connection.features.supports_update_conflicts_with_target else None
+
+    with transaction.atomic():
+        if items:
+            FoodItem.objects.bulk_create(
+                items,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=UPDATE_FIELDS,
+            )
+        if prune and plan['missing']:
+            FoodItem.objects.filter(pk__in=[item.pk for item in plan['missing']]).delete()
+        # bulk_create() sends no save signals, so bump the version here
+        bump_catalog_version()
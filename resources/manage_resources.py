@@ -8,8 +8,9 @@ USAGE:
 4. This will import all items from the CSV into the FoodItem table
 
 The script will:
-- Clear existing FoodItem data (optional - see CLEAR_EXISTING flag)
-- Import all items from CSV
+- Import all items from CSV, updating existing items by name and category
+  (same as: python manage.py import_food_items food_items_export.csv)
+- Delete items no longer in the CSV (optional - see CLEAR_EXISTING flag)
 - Show statistics about what was imported
 """
 
@@ -25,16 +26,18 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodbanked.settings')
 django.setup()
 
 # Now import models after Django is set up
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from resources.models import FoodItem
 
 
 # Configuration
 CSV_FILE = 'food_items_export.csv'  # Path relative to project root
-CLEAR_EXISTING = True  # Set to False if you want to keep existing data
+CLEAR_EXISTING = True  # Set to False to keep items the CSV doesn't list
 
 
 def import_food_items():
-    """Import food items from CSV into database"""
+    """Import food items from CSV into database (see the import_food_items command)"""
     
     # Check if CSV file exists
     if not os.path.exists(CSV_FILE):
@@ -47,66 +50,13 @@ def import_food_items():
     print("Importing Food Items from CSV")
     print("="*60)
     
-    # Optionally clear existing data
-    if CLEAR_EXISTING:
-        existing_count = FoodItem.objects.count()
-        if existing_count > 0:
-            confirm = input(f"\n⚠ This will delete {existing_count} existing food items. Continue? (yes/no): ")
-            if confirm.lower() != 'yes':
-                print("Import cancelled.")
-                return
-            FoodItem.objects.all().delete()
-            print(f"✓ Cleared {existing_count} existing items")
-    
-    # Read and import CSV
-    items_created = 0
-    items_skipped = 0
-    errors = []
-    
-    with open(CSV_FILE, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        print(f"\nImporting from {CSV_FILE}...")
-        
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 (accounting for header row)
-            try:
-                # Parse numeric fields (handle empty strings)
-                min_days = int(row['shelf_life_min_days']) if row['shelf_life_min_days'] else None
-                max_days = int(row['shelf_life_max_days']) if row['shelf_life_max_days'] else None
-                
-                # Create FoodItem
-                FoodItem.objects.create(
-                    name=row['name'],
-                    category=row['category'],
-                    subcategory=row['subcategory'],
-                    shelf_life_display=row['shelf_life_display'],
-                    shelf_life_min_days=min_days,
-                    shelf_life_max_days=max_days,
-                    notes=row['notes']
-                )
-                items_created += 1
-                
-                # Show progress every 50 items
-                if items_created % 50 == 0:
-                    print(f"  Imported {items_created} items...")
-                    
-            except Exception as e:
-                items_skipped += 1
-                errors.append(f"Row {row_num}: {row.get('name', 'Unknown')} - {str(e)}")
-    
-    # Show results
-    print("\n" + "="*60)
-    print("Import Complete!")
-    print("="*60)
-    print(f"✓ Successfully imported: {items_created} items")
-    
-    if items_skipped > 0:
-        print(f"⚠ Skipped: {items_skipped} items")
-        print("\nErrors:")
-        for error in errors[:10]:  # Show first 10 errors
-            print(f"  • {error}")
-        if len(errors) > 10:
-            print(f"  ... and {len(errors) - 10} more errors")
+    # Items are updated in place by name and category; CLEAR_EXISTING deletes
+    # the ones the CSV no longer lists, in the same transaction
+    try:
+        call_command('import_food_items', CSV_FILE, prune=CLEAR_EXISTING, verbosity=2)
+    except CommandError as e:
+        print(f"✗ {e}")
+        return
     
     # Show statistics
     print("\nBreakdown by category:")
@@ -343,8 +293,9 @@ def export_to_csv():
                     'category': item.category,
                     'subcategory': item.subcategory or '',
                     'shelf_life_display': item.shelf_life_display,
-                    'shelf_life_min_days': item.shelf_life_min_days or '',
-                    'shelf_life_max_days': item.shelf_life_max_days or '',
+                    # 0 days is a real value; only None is written blank
+                    'shelf_life_min_days': '' if item.shelf_life_min_days is None else item.shelf_life_min_days,
+                    'shelf_life_max_days': '' if item.shelf_life_max_days is None else item.shelf_life_max_days,
                     'notes': item.notes or ''
                 })
                 exported_count += 1
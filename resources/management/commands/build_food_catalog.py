@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from resources.bundle import (
+    ENCODING_SUFFIXES,
+    build_catalog_bundle,
+    bundle_path,
+    prune_catalog_bundles,
+)
+
+
+class Command(BaseCommand):
+    help = "Write the food item catalog as a content-hashed, precompressed JSON bundle for client-side search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help="Delete bundles of earlier catalogs")
+
+    def handle(self, *args, **options):
+        digest = build_catalog_bundle()
+
+        for encoding, suffix in [('identity', '')] + list(ENCODING_SUFFIXES):
+            path = bundle_path(digest, suffix)
+            if path.exists():
+                self.stdout.write(f"  {path.name}: {path.stat().st_size:,} bytes ({encoding})")
+        self.stdout.write(self.style.SUCCESS(f"✓ Food catalog bundle {digest}"))
+
+        if options['prune']:
+            deleted = prune_catalog_bundles(keep={digest})
+            self.stdout.write(self.style.SUCCESS(f"✓ Deleted {deleted} earlier bundle{'s' if deleted != 1 else ''}"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.importer import (
+    FoodItemImportError,
+    apply_food_item_import,
+    diff_food_items,
+    read_food_item_csv,
+    validate_food_items,
+)
+
+
+class Command(BaseCommand):
+    help = "Import food items from a CSV (as written by manage_resources.py), updating existing items by name and category"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', nargs='?', default='food_items_export.csv', help="Defaults to food_items_export.csv")
+        parser.add_argument('--dry-run', action='store_true', help="Show what would change without saving anything")
+        parser.add_argument('--prune', action='store_true', help="Delete catalog items that aren't in the file")
+
+    def handle(self, *args, **options):
+        try:
+            rows = read_food_item_csv(options['csv_file'])
+        except OSError as e:
+            raise CommandError(f"Can't read {options['csv_file']}: {e}")
+        except FoodItemImportError as e:
+            raise CommandError(str(e))
+
+        items, errors = validate_food_items(rows)
+        for error in errors:
+            self.stdout.write(f"  ✗ {error}")
+        if errors:
+            raise CommandError(f"{len(errors)} of {len(rows)} rows are invalid; nothing was imported")
+
+        plan = diff_food_items(items)
+        if options['dry_run'] or options['verbosity'] > 1:
+            self.show_diff(plan, options['prune'])
+
+        if not options['dry_run']:
+            apply_food_item_import(plan, prune=options['prune'])
+
+        missing = len(plan['missing'])
+        summary = (
+            f"{len(plan['inserted'])} inserted, {len(plan['updated'])} updated, {plan['unchanged']} unchanged, "
+            + (f"{missing} deleted" if options['prune'] else f"{missing} not in file")
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"✓ Dry run, nothing saved: {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Imported {len(items)} food items: {summary}"))
+
+    def show_diff(self, plan, prune):
+        for item in plan['inserted']:
+            self.stdout.write(f"  + {item}")
+        for item, changes in plan['updated']:
+            self.stdout.write(f"  ~ {item}")
+            for field, (old, new) in changes.items():
+                self.stdout.write(f"      {field}: {old!r} → {new!r}")
+        for item in plan['missing']:
+            self.stdout.write(f"  {'-' if prune else '?'} {item}" + ('' if prune else " (not in file, kept)"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:01
+
+from django.db import migrations
+
+
+def remove_duplicate_items(apps, schema_editor):
+    # Keep the oldest item of each name and category so the unique key can be
+    # added (compared the way MySQL's collation does: ignoring case and trailing spaces)
+    FoodItem = apps.get_model("resources", "FoodItem")
+    seen = set()
+    duplicates = []
+    for pk, name, category in FoodItem.objects.order_by("pk").values_list(
+        "pk", "name", "category"
+    ):
+        key = (name.rstrip().lower(), category)
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+    FoodItem.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_items, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="fooditem",
+            unique_together={("name", "category")},
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:24
+
+import time
+
+from django.db import migrations, models
+
+
+def create_catalog_version(apps, schema_editor):
+    # The row catalog_version() reads and bump_catalog_version() updates
+    CatalogVersion = apps.get_model("resources", "CatalogVersion")
+    CatalogVersion.objects.get_or_create(
+        pk=1, defaults={"version": time.time_ns() // 1000}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resources", "0002_food_item_natural_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
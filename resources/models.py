@@ -34,6 +34,8 @@ class FoodItem(models.Model):
         ordering = ['name']
         verbose_name = 'Food Item'
         verbose_name_plural = 'Food Items'
+        # The natural key imports upsert on
+        unique_together = [('name', 'category')]
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['category']),
@@ -44,4 +46,18 @@ class FoodItem(models.Model):
     
     def has_numeric_shelf_life(self):
         """Returns True if this item has calculable shelf life (not just 'use expiration date')"""
-        return self.shelf_life_min_days is not None and self.shelf_life_max_days is not None
\ No newline at end of file
+        return self.shelf_life_min_days is not None and self.shelf_life_max_days is not None
+
+
+class CatalogVersion(models.Model):
+    """
+    The one row stamping the food item catalog (see resources/catalog.py).
+    It's bumped in the same transaction as every FoodItem write, so every
+    worker and command reads the same stamp.
+    """
+
+    # Microseconds since the epoch of the latest change
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
@@ -0,0 +1,182 @@
+# resources/search.py
+import threading
+from bisect import bisect_left
+
+from foodbanked.text import normalize_tokens
+from .catalog import catalog_version
+from .models import FoodItem
+
+# Most results returned for one search
+MAX_RESULTS = 50
+
+# Scores of a query word matching an item word exactly, at its start or inside it
+EXACT, PREFIX, INFIX = 3, 2, 1
+
+# Words matched in the name count for more than ones only in the subcategory
+NAME_WEIGHT, SUBCATEGORY_WEIGHT = 2, 1
+
+# Words people search for that the catalog spells another way
+SYNONYM_GROUPS = (
+    ('soda', 'cola', 'carbonated', 'seltzer'),
+    ('ketchup', 'catsup'),
+    ('yogurt', 'yoghurt'),
+    ('barbeque', 'barbecue', 'bbq'),
+    ('pasta', 'noodle', 'spaghetti'),
+    ('macaroni', 'mac'),
+    ('luncheon', 'lunchmeat'),
+    ('dog', 'frank', 'frankfurter', 'wiener'),
+    ('vegetable', 'veggie'),
+    ('ground', 'hamburger'),
+    ('formula', 'infant'),
+    ('supplement', 'boost', 'ensure'),
+)
+
+SYNONYMS = {word: set(group) - {word} for group in SYNONYM_GROUPS for word in group}
+
+
+def word_forms(token):
+    """
+    A word and the singulars it could be the plural of ("berries" -> berry,
+    berrie; "cookies" -> cookie, cooky). Items are indexed under all of them
+    and queries look all of them up, so either spelling finds the other.
+    """
+    forms = {token}
+    if len(token) <= 3 or token.endswith(('ss', 'us', 'is')):
+        return forms
+    if token.endswith('ies'):
+        forms.add(token[:-3] + 'y')
+    if token.endswith('es'):
+        forms.add(token[:-2])
+    if token.endswith('s'):
+        forms.add(token[:-1])
+    return forms
+
+
+class FoodSearchIndex:
+    """
+    The whole catalog in memory: every item's result row and shelf life
+    range in days, and an inverted index of its name and subcategory words,
+    sorted for prefix lookups.
+    """
+
+    def __init__(self, items):
+        self.results = []
+        self.names = []
+        # item id -> (name, shelf_life_min_days, shelf_life_max_days)
+        self.shelf_lives = {}
+        # word -> {item position: field weight}
+        self.postings = {}
+
+        category_labels = dict(FoodItem.CATEGORY_CHOICES)
+        for position, item in enumerate(items):
+            self.results.append({
+                'id': item['id'],
+                'name': item['name'],
+                'category': item['category'],
+                'category_display': category_labels.get(item['category'], item['category']),
+                'subcategory': item['subcategory'],
+                'shelf_life': item['shelf_life_display'],
+            })
+            self.names.append(item['name'].lower())
+            self.shelf_lives[item['id']] = (item['name'], item['shelf_life_min_days'], item['shelf_life_max_days'])
+
+            for weight, value in ((SUBCATEGORY_WEIGHT, item['subcategory']), (NAME_WEIGHT, item['name'])):
+                for token in normalize_tokens(value):
+                    for form in word_forms(token):
+                        postings = self.postings.setdefault(form, {})
+                        postings[position] = max(postings.get(position, 0), weight)
+
+        self.words = sorted(self.postings)
+
+    @classmethod
+    def from_database(cls):
+        return cls(FoodItem.objects.values(
+            'id', 'name', 'category', 'subcategory', 'shelf_life_display',
+            'shelf_life_min_days', 'shelf_life_max_days',
+        ))
+
+    def match_word(self, query_word):
+        """{item position: best score} for the items containing a word matching `query_word`"""
+        scores = {}
+
+        def add(word, quality):
+            for position, weight in self.postings[word].items():
+                score = quality * weight
+                if score > scores.get(position, 0):
+                    scores[position] = score
+
+        forms = word_forms(query_word)
+        for form in forms:
+            # Every word starting with the form sits in one run of the sorted list
+            i = bisect_left(self.words, form)
+            while i < len(self.words) and self.words[i].startswith(form):
+                add(self.words[i], EXACT if self.words[i] == form else PREFIX)
+                i += 1
+            # Synonyms only as whole words ("pop" shouldn't find "popcorn")
+            for synonym in SYNONYMS.get(form, ()):
+                if synonym in self.postings:
+                    add(synonym, EXACT)
+
+        # Inside words ("berr" finds strawberries) once a word is specific enough
+        # not to be noise; three letters only when nothing else matched ("ilk")
+        if len(query_word) >= 4 or (len(query_word) == 3 and not scores):
+            for word in self.words:
+                if query_word in word:
+                    add(word, INFIX)
+        return scores
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Result rows of the items matching every word of the query, best first:
+        exact words before prefixes before matches inside a word, names
+        before subcategories, and names starting with the query first.
+        """
+        query_words = normalize_tokens(query)
+        if not query_words:
+            return []
+
+        totals = None
+        for query_word in dict.fromkeys(query_words):
+            scores = self.match_word(query_word)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {position: totals[position] + score for position, score in scores.items() if position in totals}
+            if not totals:
+                return []
+
+        query_text = query.strip().lower()
+        ranked = sorted(
+            totals,
+            key=lambda position: (
+                -totals[position],
+                not self.names[position].startswith(query_text),
+                len(self.names[position]),
+                self.names[position],
+            ),
+        )
+        return [self.results[position] for position in ranked[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def food_search_index(version=None):
+    """
+    The process's search index, rebuilt when the catalog version changes.
+    Pass the version if it's already been read (see request_catalog_version).
+    """
+    global _index
+    if version is None:
+        version = catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            index = FoodSearchIndex.from_database()
+            index.version = version
+            _index = index
+        return _index
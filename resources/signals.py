@@ -0,0 +1,13 @@
+# resources/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .models import FoodItem
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def food_item_changed(sender, instance, **kwargs):
+    """Any edit (e.g. in the admin) makes search indexes rebuild from the new catalog"""
+    bump_catalog_version()
@@ -1,3 +1,114 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .importer import CSV_COLUMNS
+from .models import FoodItem
+
+
+def locmem_cache(location):
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location}}
+
+
+QUINOA = {
+    'name': 'Quinoa', 'category': 'shelf_stable', 'subcategory': 'Grains',
+    'shelf_life_display': '2-3 years', 'shelf_life_min_days': '730',
+    'shelf_life_max_days': '1095', 'notes': '',
+}
+
+
+@override_settings(CACHES=locmem_cache('web-worker'))
+class CatalogTestCase(TestCase):
+    """The catalog changes in another process (a command, another worker) that shares no cache with the views"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('shelf-life', password='password'))
+        self.item = FoodItem.objects.create(
+            name='Canned Beans', category='shelf_stable', shelf_life_display='2-5 years',
+            shelf_life_min_days=730, shelf_life_max_days=1825,
+        )
+
+    def search(self, query, **headers):
+        return self.client.get(reverse('resources:search_food_items'), {'q': query}, headers=headers)
+
+    def in_other_process(self):
+        return override_settings(CACHES=locmem_cache('other-process'))
+
+    def import_items(self, rows):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        with self.in_other_process(), self.captureOnCommitCallbacks(execute=True):
+            call_command('import_food_items', path, stdout=StringIO())
+
+
+class CatalogConditionalGetTests(CatalogTestCase):
+
+    def test_repeat_request_is_not_modified(self):
+        url = reverse('resources:food_item_detail', args=[self.item.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_search_reads_the_catalog_version_once(self):
+        self.search('beans')
+        # The session and the user, then the catalog version for the ETag, Last-Modified and index
+        with self.assertNumQueries(3):
+            response = self.search('beans')
+        self.assertEqual(response.json()['total'], 1)
+
+    def test_import_changes_the_etag(self):
+        response = self.search('quinoa')
+        self.assertEqual(response.json()['total'], 0)
+        etag = response['ETag']
+
+        self.import_items([QUINOA])
+
+        response = self.search('quinoa', **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['total'], 1)
+
+    def test_edit_in_another_worker_changes_the_etag(self):
+        url = reverse('resources:food_item_detail', args=[self.item.id])
+        etag = self.client.get(url)['ETag']
+
+        self.item.notes = 'Discard if the can is bulging'
+        with self.in_other_process(), self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'bulging')
+
+
+class CatalogBundleLinkTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        catalog_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(catalog_dir.cleanup)
+        settings_override = override_settings(FOOD_CATALOG_DIR=catalog_dir.name, FOOD_CATALOG_CLIENT_SEARCH=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def catalog_url(self):
+        return self.client.get(reverse('resources:shelf_life')).context['catalog_url']
+
+    def test_page_links_a_new_bundle_after_an_import(self):
+        before = self.catalog_url()
+        self.import_items([QUINOA])
+
+        after = self.catalog_url()
+        self.assertNotEqual(after, before)
+        self.assertContains(self.client.get(after), 'Quinoa')
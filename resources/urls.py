@@ -10,5 +10,7 @@ urlpatterns = [
     # API endpoints
     path('search/', views.search_food_items, name='search_food_items'),
     path('item/<int:item_id>/', views.get_food_item_detail, name='food_item_detail'),
+    path('catalog/<str:digest>.json', views.food_catalog_bundle, name='food_catalog_bundle'),
+    path('expiry/', views.evaluate_expiry_api, name='evaluate_expiry'),
 
 ]
\ No newline at end of file
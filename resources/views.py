@@ -1,22 +1,66 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from foodbanked.utils import get_foodbank_today
+from .bundle import BUNDLE_NAME_RE, ENCODING_SUFFIXES, bundle_path, current_catalog_digest
+from .catalog import catalog_etag, catalog_last_modified, request_catalog_version
+from .expiry import ExpiryRequestError, evaluate_expiry, parse_expiry_request
 from .models import FoodItem
+from .search import food_search_index
+
+# A bundle's name changes with its content, so browsers can keep it for good
+BUNDLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
 
 
 @login_required
 def shelf_life(request):
     """Main shelf life search page"""
-    return render(request, 'resources/shelf_life.html')
+    context = {}
+    if settings.FOOD_CATALOG_CLIENT_SEARCH:
+        # Searched in the browser once downloaded; the search API is the fallback
+        context['catalog_url'] = reverse('resources:food_catalog_bundle', args=[current_catalog_digest()])
+    return render(request, 'resources/shelf_life.html', context)
 
 
 @login_required
+def food_catalog_bundle(request, digest):
+    """
+    A catalog bundle written by resources.bundle, sent precompressed in the
+    best encoding the browser accepts
+    """
+    if not BUNDLE_NAME_RE.match(f'catalog.{digest}.json') or not bundle_path(digest).exists():
+        raise Http404("No such catalog bundle")
+
+    accepted = {value.split(';')[0].strip().lower() for value in request.headers.get('Accept-Encoding', '').split(',')}
+    path, encoding = bundle_path(digest), None
+    for candidate, suffix in ENCODING_SUFFIXES:
+        if candidate in accepted and bundle_path(digest, suffix).exists():
+            path, encoding = bundle_path(digest, suffix), candidate
+            break
+
+    response = FileResponse(open(path, 'rb'), content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Cache-Control'] = BUNDLE_CACHE_CONTROL
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def search_food_items(request):
     """
     API endpoint for autocomplete search
-    Searches in name, category, and subcategory
-    Returns results grouped by category
+    Searches in name and subcategory words (see resources.search)
+    Returns results grouped by category, best matches first
+    Browsers revalidate with the catalog version and get a 304 until it changes
     """
     query = request.GET.get('q', '').strip()
     
@@ -24,45 +68,26 @@ def search_food_items(request):
     if len(query) < 2:
         return JsonResponse({'results': {}})
     
-    # Search in name, category display, and subcategory
-    items = FoodItem.objects.filter(
-        Q(name__icontains=query) |
-        Q(subcategory__icontains=query)
-    ).select_related().order_by('category', 'name')[:50]  # Limit to 50 results
+    # Served from the in-memory index, checked against the version @condition
+    # already read; no query unless the catalog changed
+    matches = food_search_index(request_catalog_version(request)).search(query)
     
-    # Group results by category
+    # Group results by category, in category order
     results_by_category = {}
-    category_order = ['baby_food', 'shelf_stable', 'refrigerated', 'frozen']
-    
-    for item in items:
-        category_display = item.get_category_display()
-        
-        if category_display not in results_by_category:
-            results_by_category[category_display] = []
-        
-        results_by_category[category_display].append({
-            'id': item.id,
-            'name': item.name,
-            'category': item.category,
-            'category_display': category_display,
-            'subcategory': item.subcategory,
-            'shelf_life': item.shelf_life_display,
-        })
-    
-    # Return results in category order
-    ordered_results = {}
-    for cat_key in category_order:
-        cat_display = dict(FoodItem.CATEGORY_CHOICES).get(cat_key)
-        if cat_display in results_by_category:
-            ordered_results[cat_display] = results_by_category[cat_display]
+    for cat_key, cat_display in FoodItem.CATEGORY_CHOICES:
+        items = [item for item in matches if item['category'] == cat_key]
+        if items:
+            results_by_category[cat_display] = items
     
     return JsonResponse({
-        'results': ordered_results,
-        'total': sum(len(items) for items in ordered_results.values())
+        'results': results_by_category,
+        'total': sum(len(items) for items in results_by_category.values())
     })
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def get_food_item_detail(request, item_id):
     """
     Get detailed information about a specific food item
@@ -92,4 +117,30 @@ def get_food_item_detail(request, item_id):
         'notes': item.notes,
     }
     
-    return JsonResponse(data)
\ No newline at end of file
+    return JsonResponse(data)
+
+
+@login_required
+@require_POST
+def evaluate_expiry_api(request):
+    """
+    Keep/inspect/discard decisions for a manifest of donated items, as JSON
+    {"items": [{"item_id": 12, "best_by": "YYYY-MM-DD"}, ...], "as_of": "YYYY-MM-DD"}
+    (as_of defaults to today). Lines that can't be judged carry an error
+    instead; see resources.expiry.
+    """
+    try:
+        lines, as_of = parse_expiry_request(request.body.decode('utf-8', errors='replace'))
+    except ExpiryRequestError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if as_of is None:
+        # A pantry's own today; organization admins get the server's
+        as_of = get_foodbank_today(request.user.foodbank) if hasattr(request.user, 'foodbank') else timezone.localdate()
+    results = evaluate_expiry(lines, as_of)
+    
+    summary = {'keep': 0, 'inspect': 0, 'discard': 0, 'error': 0}
+    for result in results:
+        summary[result.get('decision', 'error')] += 1
+    
+    return JsonResponse({'success': True, 'as_of': as_of.isoformat(), 'summary': summary, 'results': results})
@@ -8,6 +8,10 @@ document.addEventListener('DOMContentLoaded', function() {
     let searchTimeout;
     let currentFocus = -1;
     
+    // The whole catalog, once downloaded; until then (or if it can't be) searches go to the server
+    let catalog = null;
+    loadCatalog(searchInput.dataset.catalogUrl);
+    
     // Search input handler with debouncing
     searchInput.addEventListener('input', function() {
         clearTimeout(searchTimeout);
@@ -21,10 +25,10 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Debounce search by 300ms
+        // Debounce server searches by 300ms; the local catalog answers as you type
         searchTimeout = setTimeout(() => {
             performSearch(query);
-        }, 300);
+        }, catalog ? 0 : 300);
     });
     
     // Clear search
@@ -71,8 +75,14 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
-    // Perform search via API
+    // Perform search in the downloaded catalog, or via API
     function performSearch(query) {
+        if (catalog) {
+            const found = catalog.search(query);
+            displayResults(found.results, found.total);
+            return;
+        }
+        
         fetch(`/resources/search/?q=${encodeURIComponent(query)}`)
             .then(response => response.json())
             .then(data => {
@@ -178,6 +188,14 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Show item detail in modal
     function showItemDetail(itemId) {
+        const item = catalog && catalog.item(itemId);
+        if (item) {
+            displayItemDetail(item);
+            modal.show();
+            hideResults();
+            return;
+        }
+        
         fetch(`/resources/item/${itemId}/`)
             .then(response => response.json())
             .then(data => {
@@ -285,4 +303,198 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
         searchResults.style.display = 'block';
     }
-});
\ No newline at end of file
+    
+    // Download the catalog bundle for searching offline. The last one loaded
+    // is kept in localStorage, so a page that can't reach the server still
+    // searches the catalog as it was then.
+    function loadCatalog(url) {
+        if (!url) return;
+        
+        fetch(url)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(bundle => {
+                catalog = new FoodCatalog(bundle);
+                try {
+                    localStorage.setItem(CATALOG_STORAGE_KEY, JSON.stringify(bundle));
+                } catch (error) {
+                    // Storage full or disabled; the catalog still works for this visit
+                }
+            })
+            .catch(error => {
+                console.warn('Catalog download failed, using the last saved copy or the server:', error);
+                try {
+                    const saved = localStorage.getItem(CATALOG_STORAGE_KEY);
+                    if (saved) catalog = new FoodCatalog(JSON.parse(saved));
+                } catch (storageError) {
+                    catalog = null;
+                }
+            });
+    }
+});
+
+
+// Client-side search over a catalog bundle (see resources/bundle.py). It
+// matches and ranks the way resources/search.py does on the server, so
+// both modes show the same results.
+const CATALOG_STORAGE_KEY = 'foodCatalogBundle';
+const MAX_RESULTS = 50;
+const EXACT = 3, PREFIX = 2, INFIX = 1;
+const NAME_WEIGHT = 2, SUBCATEGORY_WEIGHT = 1;
+
+// Lowercase, accent-fold and split a string into alphanumeric tokens (visits.search.normalize_tokens)
+function normalizeTokens(value) {
+    return String(value || '')
+        .normalize('NFKD')
+        .replace(/\p{M}/gu, '')
+        .toLowerCase()
+        .split(/[^a-z0-9]+/)
+        .filter(token => token)
+        .map(token => token.slice(0, 100));
+}
+
+// A word and the singulars it could be the plural of ("berries" -> berry, berrie)
+function wordForms(token) {
+    const forms = new Set([token]);
+    if (token.length <= 3 || /(ss|us|is)$/.test(token)) return forms;
+    if (token.endsWith('ies')) forms.add(token.slice(0, -3) + 'y');
+    if (token.endsWith('es')) forms.add(token.slice(0, -2));
+    if (token.endsWith('s')) forms.add(token.slice(0, -1));
+    return forms;
+}
+
+class FoodCatalog {
+    constructor(bundle) {
+        const labels = Object.fromEntries(bundle.categories);
+        this.categories = bundle.categories;
+        this.items = [];
+        this.itemsById = new Map();
+        // word -> Map(item position -> field weight)
+        this.postings = new Map();
+        this.synonyms = new Map();
+        
+        bundle.synonyms.forEach(group => {
+            group.forEach(word => {
+                this.synonyms.set(word, group.filter(other => other !== word));
+            });
+        });
+        
+        bundle.items.forEach((row, position) => {
+            const item = {};
+            bundle.fields.forEach((field, i) => { item[field] = row[i]; });
+            item.category_display = labels[item.category] || item.category;
+            item.has_numeric_shelf_life = item.shelf_life_min_days !== null && item.shelf_life_max_days !== null;
+            item.lowerName = item.name.toLowerCase();
+            this.items.push(item);
+            this.itemsById.set(String(item.id), item);
+            
+            [[SUBCATEGORY_WEIGHT, item.subcategory], [NAME_WEIGHT, item.name]].forEach(([weight, value]) => {
+                normalizeTokens(value).forEach(token => {
+                    wordForms(token).forEach(form => {
+                        if (!this.postings.has(form)) this.postings.set(form, new Map());
+                        const postings = this.postings.get(form);
+                        postings.set(position, Math.max(postings.get(position) || 0, weight));
+                    });
+                });
+            });
+        });
+        
+        // Tokens are plain ASCII, so the default sort matches Python's
+        this.words = Array.from(this.postings.keys()).sort();
+    }
+    
+    item(id) {
+        return this.itemsById.get(String(id)) || null;
+    }
+    
+    // First index of the sorted words not less than `word`
+    lowerBound(word) {
+        let low = 0, high = this.words.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (this.words[middle] < word) low = middle + 1;
+            else high = middle;
+        }
+        return low;
+    }
+    
+    // Map(item position -> best score) for the items containing a word matching `queryWord`
+    matchWord(queryWord) {
+        const scores = new Map();
+        const add = (word, quality) => {
+            this.postings.get(word).forEach((weight, position) => {
+                const score = quality * weight;
+                if (score > (scores.get(position) || 0)) scores.set(position, score);
+            });
+        };
+        
+        wordForms(queryWord).forEach(form => {
+            for (let i = this.lowerBound(form); i < this.words.length && this.words[i].startsWith(form); i++) {
+                add(this.words[i], this.words[i] === form ? EXACT : PREFIX);
+            }
+            // Synonyms only as whole words
+            (this.synonyms.get(form) || []).forEach(synonym => {
+                if (this.postings.has(synonym)) add(synonym, EXACT);
+            });
+        });
+        
+        // Inside words once a word is specific enough not to be noise
+        if (queryWord.length >= 4 || (queryWord.length === 3 && scores.size === 0)) {
+            this.words.forEach(word => {
+                if (word.includes(queryWord)) add(word, INFIX);
+            });
+        }
+        return scores;
+    }
+    
+    // Items matching every word of the query, best first, grouped by category
+    // like the search API's response: {results: {label: [rows]}, total}
+    search(query) {
+        const queryWords = Array.from(new Set(normalizeTokens(query)));
+        let totals = null;
+        for (const queryWord of queryWords) {
+            const scores = this.matchWord(queryWord);
+            if (totals === null) {
+                totals = scores;
+            } else {
+                const combined = new Map();
+                scores.forEach((score, position) => {
+                    if (totals.has(position)) combined.set(position, totals.get(position) + score);
+                });
+                totals = combined;
+            }
+            if (totals.size === 0) break;
+        }
+        if (!totals || totals.size === 0) return { results: {}, total: 0 };
+        
+        const queryText = query.trim().toLowerCase();
+        const ranked = Array.from(totals.keys()).sort((a, b) => {
+            const itemA = this.items[a], itemB = this.items[b];
+            return (totals.get(b) - totals.get(a))
+                || (!itemA.lowerName.startsWith(queryText) - !itemB.lowerName.startsWith(queryText))
+                || (itemA.lowerName.length - itemB.lowerName.length)
+                || (itemA.lowerName < itemB.lowerName ? -1 : itemA.lowerName > itemB.lowerName ? 1 : 0);
+        }).slice(0, MAX_RESULTS);
+        
+        const results = {};
+        let total = 0;
+        this.categories.forEach(([key, label]) => {
+            const rows = ranked
+                .map(position => this.items[position])
+                .filter(item => item.category === key)
+                .map(item => ({
+                    id: item.id,
+                    name: item.name,
+                    subcategory: item.subcategory,
+                    shelf_life: item.shelf_life_display,
+                }));
+            if (rows.length) {
+                results[label] = rows;
+                total += rows.length;
+            }
+        });
+        return { results, total };
+    }
+}
\ No newline at end of file
@@ -2,9 +2,201 @@
 (function() {
     'use strict';
     
-    // Parse patron data from script tag
-    const patronDataElement = document.getElementById('patronData');
-    let patrons = patronDataElement ? JSON.parse(patronDataElement.textContent) : [];
+    // Patron roster, kept in localStorage and synced incrementally from the roster API
+    const ROSTER_VERSION = 1;
+    let patrons = [];
+    
+    function loadCachedRoster(key) {
+        try {
+            const cached = JSON.parse(localStorage.getItem(key));
+            if (cached && cached.version === ROSTER_VERSION) return cached;
+        } catch (e) {
+            // Corrupt or unavailable storage - fall through to a full sync
+        }
+        return null;
+    }
+    
+    function saveCachedRoster(key, roster) {
+        try {
+            localStorage.setItem(key, JSON.stringify(roster));
+        } catch (e) {
+            // Quota exceeded or storage disabled - roster just won't persist between loads
+            try { localStorage.removeItem(key); } catch (ignored) {}
+        }
+    }
+    
+    function sortRoster(list) {
+        return list.sort((a, b) =>
+            (a.last_name || '').localeCompare(b.last_name || '') ||
+            (a.first_name || '').localeCompare(b.first_name || '')
+        );
+    }
+    
+    function fetchRoster(url, since) {
+        const requestUrl = since ? `${url}?since=${encodeURIComponent(since)}` : url;
+        return fetch(requestUrl, { credentials: 'same-origin' }).then(response => {
+            if (!response.ok) throw new Error(`Roster sync failed: ${response.status}`);
+            return response.json();
+        });
+    }
+    
+    // Full snapshot on first load, then only patrons changed since the saved watermark
+    function syncPatronRoster(url, key) {
+        const cached = loadCachedRoster(key);
+        if (cached) patrons = cached.patrons;
+        
+        return fetchRoster(url, cached && cached.watermark).then(data => {
+            let list = data.patrons;
+            
+            if (!data.full && cached) {
+                const byId = new Map(cached.patrons.map(p => [p.id, p]));
+                data.patrons.forEach(p => byId.set(p.id, p));
+                
+                // Drop patrons deleted since the last sync
+                const current = new Set(data.ids);
+                list = Array.from(byId.values()).filter(p => current.has(p.id));
+                
+                // Still a mismatch means the cache is missing patrons - start over from a snapshot
+                if (list.length !== data.total) {
+                    return fetchRoster(url, null).then(snapshot => {
+                        patrons = sortRoster(snapshot.patrons);
+                        saveCachedRoster(key, { version: snapshot.version, watermark: snapshot.watermark, patrons: patrons });
+                        return patrons;
+                    });
+                }
+            }
+            
+            patrons = sortRoster(list);
+            saveCachedRoster(key, { version: data.version, watermark: data.watermark, patrons: patrons });
+            return patrons;
+        }).catch(error => {
+            // Offline or server error - keep working from the cached roster
+            console.error('Error syncing patron roster:', error);
+            return patrons;
+        });
+    }
+    
+    // Offline visit queue: recorded visits are kept in IndexedDB and sent to the
+    // sync endpoint in the background, so intake never waits on the network.
+    // Each visit gets a client_uuid, which the server dedupes on when a batch is resent.
+    const QUEUE_DB = 'foodbankedVisitQueue';
+    const QUEUE_STORE = 'visits';
+    const SYNC_BATCH_SIZE = 100;
+    const SYNC_RETRY_MS = 30000;
+    
+    function openVisitQueue() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(QUEUE_DB, 1);
+            request.onupgradeneeded = () => {
+                const store = request.result.createObjectStore(QUEUE_STORE, { keyPath: 'client_uuid' });
+                store.createIndex('queueKey', 'queueKey');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    
+    // Run `work` against the store; resolves with its request's result once the transaction commits
+    function queueTransaction(db, mode, work) {
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(QUEUE_STORE, mode);
+            const request = work(tx.objectStore(QUEUE_STORE));
+            tx.oncomplete = () => resolve(request ? request.result : undefined);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+    
+    function queueVisits(db, entries) {
+        return queueTransaction(db, 'readwrite', store => {
+            entries.forEach(entry => store.put(entry));
+        });
+    }
+    
+    // Visits queued for one foodbank (several may share a browser)
+    function queuedVisits(db, queueKey) {
+        return queueTransaction(db, 'readonly', store => store.index('queueKey').getAll(queueKey));
+    }
+    
+    function removeQueuedVisits(db, clientUuids) {
+        return queueTransaction(db, 'readwrite', store => {
+            clientUuids.forEach(clientUuid => store.delete(clientUuid));
+        });
+    }
+    
+    function newClientUuid() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        // randomUUID() needs a secure context; build a version 4 UUID by hand otherwise
+        const bytes = crypto.getRandomValues(new Uint8Array(16));
+        bytes[6] = (bytes[6] & 0x0f) | 0x40;
+        bytes[8] = (bytes[8] & 0x3f) | 0x80;
+        const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+        return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+    }
+    
+    // Today's date (YYYY-MM-DD) in the foodbank's timezone, like get_foodbank_today()
+    function foodbankToday(timeZone) {
+        try {
+            return new Intl.DateTimeFormat('en-CA', { timeZone: timeZone }).format(new Date());
+        } catch (e) {
+            const now = new Date();
+            return `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-${String(now.getDate()).padStart(2, '0')}`;
+        }
+    }
+    
+    function postVisitBatch(url, csrftoken, entries) {
+        return fetch(url, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrftoken },
+            body: JSON.stringify({ visits: entries.map(entry => entry.visit) })
+        }).then(response => {
+            // A redirect means the session expired and we got the login page
+            if (!response.ok || response.redirected) throw new Error(`Visit sync failed: ${response.status}`);
+            return response.json();
+        });
+    }
+    
+    // Send the queue in batches, oldest first. Synced visits leave the queue;
+    // rejected ones stay in it, marked with the server's errors and no longer
+    // sent, until staff re-enter and dismiss them. Anything unsent stays for
+    // the next attempt. Resolves with the newly rejected entries.
+    function syncVisitQueue(url, queueKey, csrftoken) {
+        return openVisitQueue().then(db => queuedVisits(db, queueKey).then(entries => {
+            entries = entries.filter(entry => !entry.rejected);
+            entries.sort((a, b) => a.queuedAt - b.queuedAt);
+            const rejected = [];
+            
+            function sendNext(start) {
+                const batch = entries.slice(start, start + SYNC_BATCH_SIZE);
+                if (!batch.length) return Promise.resolve(rejected);
+                
+                return postVisitBatch(url, csrftoken, batch).then(data => {
+                    const batchRejected = [];
+                    data.rejected.forEach(item => {
+                        const entry = batch.find(e => e.client_uuid === item.client_uuid);
+                        if (!entry) return;
+                        entry.rejected = item.errors;
+                        batchRejected.push(entry);
+                    });
+                    rejected.push(...batchRejected);
+                    return queueVisits(db, batchRejected)
+                        .then(() => removeQueuedVisits(db, data.synced))
+                        .then(() => sendNext(start + SYNC_BATCH_SIZE));
+                });
+            }
+            
+            return sendNext(0);
+        }));
+    }
+    
+    // Queued visits split into those waiting to sync and those the server rejected
+    function queuedVisitStatus(queueKey) {
+        return openVisitQueue().then(db => queuedVisits(db, queueKey)).then(entries => ({
+            waiting: entries.filter(entry => !entry.rejected).length,
+            rejected: entries.filter(entry => entry.rejected).sort((a, b) => a.queuedAt - b.queuedAt)
+        }));
+    }
     
     // Store currently selected patron for editing
     let currentPatron = null;
@@ -14,6 +206,12 @@
         // Check if we have patron data in the URL (from creating new patron)
         const urlParams = new URLSearchParams(window.location.search);
         const patronId = urlParams.get('patron_id');
+        
+        // Start syncing the patron roster right away; searches use whatever is loaded
+        const visitFormElement = document.getElementById('visitForm');
+        const rosterReady = (visitFormElement && visitFormElement.dataset.rosterUrl)
+            ? syncPatronRoster(visitFormElement.dataset.rosterUrl, visitFormElement.dataset.rosterKey)
+            : Promise.resolve(patrons);
  
         // Service zipcodes data (passed from backend)
         const serviceZipcodes = JSON.parse(document.getElementById('serviceZipcodesData')?.textContent || '[]');
@@ -441,53 +639,56 @@
                 }
             });
             
-            // Restore patron selection if form had errors
-            const preselectedPatronId = selectedPatronId.value;
-            if (preselectedPatronId) {
-                const patron = patrons.find(p => p.id == preselectedPatronId);
-                if (patron) {
-                    // Show patron info and search, but DON'T auto-populate form fields
-                    patronSearch.value = `${patron.last_name}, ${patron.first_name}`;
-                    displayPatronInfo(patron);
-                    displayVisitCount(patron);
-                    // Don't call selectPatron() because that would overwrite the form values
+            // Restore selections once the roster has synced (they look patrons up by id)
+            rosterReady.then(function() {
+                // Restore patron selection if form had errors
+                const preselectedPatronId = selectedPatronId.value;
+                if (preselectedPatronId) {
+                    const patron = patrons.find(p => p.id == preselectedPatronId);
+                    if (patron) {
+                        // Show patron info and search, but DON'T auto-populate form fields
+                        patronSearch.value = `${patron.last_name}, ${patron.first_name}`;
+                        displayPatronInfo(patron);
+                        displayVisitCount(patron);
+                        // Don't call selectPatron() because that would overwrite the form values
+                    }
                 }
-            }
           
-            // RESTORE STATE AFTER VALIDATION ERROR
-            const formStateElement = document.getElementById('formStateData');
-            if (formStateElement) {
-                const formState = JSON.parse(formStateElement.textContent);
-                const selectedPatronIdFromServer = formState.selected_patron_id;
-                const searchTypeFromServer = formState.search_type;
+                // RESTORE STATE AFTER VALIDATION ERROR
+                const formStateElement = document.getElementById('formStateData');
+                if (formStateElement) {
+                    const formState = JSON.parse(formStateElement.textContent);
+                    const selectedPatronIdFromServer = formState.selected_patron_id;
+                    const searchTypeFromServer = formState.search_type;
 
-                // ONLY restore if search_type exists (means validation error occurred)
-                if (searchTypeFromServer) {
-                    if (searchTypeFromServer === 'anonymous') {
-                        // Restore anonymous mode
-                        if (searchTypeSelect) searchTypeSelect.value = 'anonymous';
-                        if (patronSearchSection) patronSearchSection.style.display = 'none';
-                        const searchTypeHidden = document.getElementById('searchTypeHidden');
-                        if (searchTypeHidden) searchTypeHidden.value = 'anonymous';
-                    } else {
-                        // Restore "By Name" mode
-                        const dropdownValue = searchTypeFromServer === 'name' ? 'last_name' : searchTypeFromServer;
-                        if (searchTypeSelect) searchTypeSelect.value = dropdownValue;
-                        if (patronSearchSection) patronSearchSection.style.display = 'block';
-                        updateSearchPlaceholder();
-                        const searchTypeHidden = document.getElementById('searchTypeHidden');
-                        if (searchTypeHidden) searchTypeHidden.value = searchTypeFromServer;
+                    // ONLY restore if search_type exists (means validation error occurred)
+                    if (searchTypeFromServer) {
+                        if (searchTypeFromServer === 'anonymous') {
+                            // Restore anonymous mode
+                            if (searchTypeSelect) searchTypeSelect.value = 'anonymous';
+                            if (patronSearchSection) patronSearchSection.style.display = 'none';
+                            const searchTypeHidden = document.getElementById('searchTypeHidden');
+                            if (searchTypeHidden) searchTypeHidden.value = 'anonymous';
+                        } else {
+                            // Restore "By Name" mode
+                            const dropdownValue = searchTypeFromServer === 'name' ? 'last_name' : searchTypeFromServer;
+                            if (searchTypeSelect) searchTypeSelect.value = dropdownValue;
+                            if (patronSearchSection) patronSearchSection.style.display = 'block';
+                            updateSearchPlaceholder();
+                            const searchTypeHidden = document.getElementById('searchTypeHidden');
+                            if (searchTypeHidden) searchTypeHidden.value = searchTypeFromServer;
                         
-                        // Restore patron if one was selected
-                        if (selectedPatronIdFromServer) {
-                            const patron = patrons.find(p => p.id === parseInt(selectedPatronIdFromServer));
-                            if (patron) {
-                                selectPatron(patron);
+                            // Restore patron if one was selected
+                            if (selectedPatronIdFromServer) {
+                                const patron = patrons.find(p => p.id === parseInt(selectedPatronIdFromServer));
+                                if (patron) {
+                                    selectPatron(patron);
+                                }
                             }
                         }
                     }
                 }
-            }
+            });
         }
 
         // Edit patron button - only if element exists
@@ -745,6 +946,14 @@
 
         // Validate visit type checkboxes when food truck is enabled
         const visitForm = document.getElementById('visitForm');
+        const syncUrl = visitForm && visitForm.dataset.syncUrl;
+        const queueKey = visitForm && visitForm.dataset.queueKey;
+        const offlineQueue = Boolean(syncUrl && window.indexedDB);
+        const syncStatus = document.getElementById('syncStatus');
+        const rejectedVisits = document.getElementById('rejectedVisits');
+        const todaysVisitCount = document.getElementById('todaysVisitCount');
+        let syncing = null;
+        
         if (visitForm) {
             visitForm.addEventListener('submit', function(e) {
                 // First, run our custom validation
@@ -752,8 +961,160 @@
                     e.preventDefault();
                     return false;
                 }
+                
+                // Every visit goes through the queue and is sent with fetch, so intake
+                // never waits on a page load; it stays queued until the server takes it
+                if (offlineQueue) {
+                    e.preventDefault();
+                    queueVisitFromForm();
+                }
+            });
+        }
+        
+        // One queued visit per selected visit type, as the server creates on a normal post
+        function queuedEntriesFromForm() {
+            const data = new FormData(visitForm);
+            const visitTypes = [];
+            if (document.getElementById('visitTypePantry') || document.getElementById('visitTypeFoodTruck')) {
+                if (data.get('visit_type_pantry') === 'on') visitTypes.push(false);
+                if (data.get('visit_type_food_truck') === 'on') visitTypes.push(true);
+            } else {
+                visitTypes.push(false);
+            }
+            
+            const queuedAt = Date.now();
+            return visitTypes.map(isFoodTruck => {
+                const clientUuid = newClientUuid();
+                return {
+                    client_uuid: clientUuid,
+                    queueKey: queueKey,
+                    queuedAt: queuedAt,
+                    visit: {
+                        client_uuid: clientUuid,
+                        visit_date: foodbankToday(visitForm.dataset.timezone),
+                        patron_id: data.get('patron_id') || '',
+                        zipcode: data.get('zipcode') || '',
+                        city: data.get('city') || '',
+                        state: data.get('state') || '',
+                        household_size: data.get('household_size') || '',
+                        age_0_18: data.get('age_0_18') || '0',
+                        age_19_59: data.get('age_19_59') || '0',
+                        age_60_plus: data.get('age_60_plus') || '0',
+                        first_visit_this_month: data.get('first_visit_this_month') === 'on',
+                        is_food_truck: isFoodTruck,
+                        comments: data.get('comments') || ''
+                    }
+                };
             });
         }
+        
+        function queueVisitFromForm() {
+            const entries = queuedEntriesFromForm();
+            if (!entries.length) {
+                // No visit type selected - let the server explain
+                visitForm.submit();
+                return;
+            }
+            openVisitQueue().then(db => queueVisits(db, entries)).then(() => {
+                const pantryVisits = entries.filter(entry => !entry.visit.is_food_truck).length;
+                if (todaysVisitCount && pantryVisits) {
+                    todaysVisitCount.textContent = Number(todaysVisitCount.textContent) + pantryVisits;
+                }
+                showToast(entries.length === 1 ? 'Visit recorded!' : `${entries.length} visits recorded!`, 'success');
+                resetForNextVisit();
+                syncQueuedVisits();
+            }).catch(error => {
+                // IndexedDB unavailable (e.g. private browsing) - fall back to a normal post
+                console.error('Could not queue visit:', error);
+                visitForm.submit();
+            });
+        }
+        
+        // Ready the form for the next household without a page load. The visit
+        // type checkboxes are kept, since a food truck shift records one type all day.
+        function resetForNextVisit() {
+            clearErrorMessages();
+            clearPatronSelection();
+            if (patronSearch) patronSearch.value = '';
+            if (patronResults) patronResults.style.display = 'none';
+            clearFormFields();
+            const commentsInput = document.getElementById('id_comments');
+            if (commentsInput) commentsInput.value = '';
+            if (patronSearch && patronSearch.offsetParent !== null) patronSearch.focus();
+        }
+        
+        function updateSyncStatus(message) {
+            if (syncStatus) syncStatus.textContent = message;
+        }
+        
+        function showQueuedCount() {
+            return queuedVisitStatus(queueKey).then(status => {
+                const count = status.waiting;
+                updateSyncStatus(count ? `${count} visit${count === 1 ? '' : 's'} waiting to sync` : '');
+                showRejectedVisits(status.rejected);
+            });
+        }
+        
+        // List the queued visits the server refused, so staff can re-enter them
+        function showRejectedVisits(entries) {
+            if (!rejectedVisits) return;
+            rejectedVisits.innerHTML = '';
+            rejectedVisits.style.display = entries.length ? 'block' : 'none';
+            if (!entries.length) return;
+            
+            const heading = document.createElement('strong');
+            heading.textContent = `${entries.length} queued visit${entries.length === 1 ? ' was' : 's were'} not recorded. Please re-enter:`;
+            rejectedVisits.appendChild(heading);
+            
+            const list = document.createElement('ul');
+            list.className = 'mb-0 mt-1';
+            entries.forEach(entry => {
+                const visit = entry.visit;
+                const errors = Object.values(entry.rejected).flat().join(' ');
+                const item = document.createElement('li');
+                item.textContent = `${visit.visit_date}: ${visit.is_food_truck ? 'food truck' : 'pantry'} visit, ` +
+                    `zipcode ${visit.zipcode || '-'}, household of ${visit.household_size || '?'} - ${errors} `;
+                
+                const dismiss = document.createElement('button');
+                dismiss.type = 'button';
+                dismiss.className = 'btn btn-link btn-sm p-0 align-baseline';
+                dismiss.textContent = 'Dismiss';
+                dismiss.addEventListener('click', () => {
+                    openVisitQueue()
+                        .then(db => removeQueuedVisits(db, [entry.client_uuid]))
+                        .then(showQueuedCount)
+                        .catch(error => console.error('Could not dismiss visit:', error));
+                });
+                item.appendChild(dismiss);
+                list.appendChild(item);
+            });
+            rejectedVisits.appendChild(list);
+        }
+        
+        function syncQueuedVisits() {
+            if (syncing) return syncing;
+            const csrftoken = document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+            
+            syncing = syncVisitQueue(syncUrl, queueKey, csrftoken).then(rejected => {
+                if (rejected.length) {
+                    showToast(`${rejected.length} queued visit${rejected.length === 1 ? ' was' : 's were'} rejected by the server`, 'error');
+                }
+            }).catch(error => {
+                // Offline or server error - the queue is kept and retried
+                console.error('Error syncing visits:', error);
+            }).then(showQueuedCount).catch(error => {
+                console.error('Error showing the visit queue:', error);
+            }).then(() => {
+                syncing = null;
+            });
+            return syncing;
+        }
+        
+        if (offlineQueue) {
+            syncQueuedVisits();
+            window.addEventListener('online', syncQueuedVisits);
+            setInterval(syncQueuedVisits, SYNC_RETRY_MS);
+        }
 
         let selectedZipcodeIndex = -1;
 
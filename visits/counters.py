@@ -0,0 +1,180 @@
+# visits/counters.py
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Patron, PatronMonthlyVisits, Visit
+from .rollups import rollup_key
+
+# Patron's last-visit snapshot fields and the visit fields they're copied from
+LAST_VISIT_FIELDS = {
+    'last_visit_date': 'visit_date',
+    'last_zipcode': 'zipcode',
+    'last_household_size': 'household_size',
+    'last_age_0_18': 'age_0_18',
+    'last_age_19_59': 'age_19_59',
+    'last_age_60_plus': 'age_60_plus',
+}
+
+
+def counter_key(visit):
+    """The (patron_id, month) counter a visit is counted in, or None for anonymous visits"""
+    if not visit.patron_id:
+        return None
+    return (visit.patron_id, visit.visit_date.replace(day=1))
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def compute_patron_counters(visits):
+    """Build unsaved counter rows for a queryset of visits in one grouped query"""
+    rows = visits.filter(patron__isnull=False).order_by().annotate(
+        month=TruncMonth('visit_date')
+    ).values('patron_id', 'month').annotate(
+        visit_count=Count('id'),
+        last_visit_date=Max('visit_date'),
+    )
+    return [PatronMonthlyVisits(**row) for row in rows]
+
+
+def sync_patron_months(keys):
+    """
+    Recount the (patron_id, month) counters in `keys` and mark the earliest
+    visit of each month as the patron's first visit this month.
+
+    The counter row is locked while its month is recounted, so concurrent
+    check-ins for the same patron can't both count as the first. Returns
+    {visit id: rollup key} for the visits whose first_visit_this_month flag changed.
+    """
+    flipped = {}
+    for patron_id, month in keys:
+        with transaction.atomic():
+            PatronMonthlyVisits.objects.get_or_create(
+                patron_id=patron_id, month=month, defaults={'last_visit_date': month}
+            )
+            counter = PatronMonthlyVisits.objects.select_for_update().get(patron_id=patron_id, month=month)
+
+            visits = list(
+                Visit.objects.filter(patron_id=patron_id, visit_date__gte=month, visit_date__lt=next_month(month))
+                .order_by('visit_date', 'id')
+                .only('id', 'foodbank_id', 'visit_date', 'is_food_truck', 'first_visit_this_month')
+            )
+            if not visits:
+                counter.delete()
+                continue
+
+            counter.visit_count = len(visits)
+            counter.last_visit_date = visits[-1].visit_date
+            counter.save(update_fields=['visit_count', 'last_visit_date'])
+
+            for i, visit in enumerate(visits):
+                if visit.first_visit_this_month != (i == 0):
+                    Visit.objects.filter(pk=visit.pk).update(first_visit_this_month=i == 0)
+                    flipped[visit.pk] = rollup_key(visit)
+    return flipped
+
+
+def rebuild_patron_counters(foodbank_id=None):
+    """Replace every counter row (of one foodbank, if given) with fresh counts"""
+    visits = Visit.objects.all()
+    stale = PatronMonthlyVisits.objects.all()
+    if foodbank_id:
+        visits = visits.filter(patron__foodbank_id=foodbank_id)
+        stale = stale.filter(patron__foodbank_id=foodbank_id)
+
+    counters = compute_patron_counters(visits)
+    with transaction.atomic():
+        stale.delete()
+        PatronMonthlyVisits.objects.bulk_create(counters, batch_size=1000)
+
+    return len(counters)
+
+
+def fix_first_visit_flags(visits):
+    """
+    Set first_visit_this_month on a queryset of visits: true for each
+    patron's earliest visit of a month, false for the rest. The queryset must
+    cover whole patron-months. Returns the rollup keys of the visits that changed.
+    """
+    rows = visits.filter(patron__isnull=False).order_by('patron_id', 'visit_date', 'id').values_list(
+        'id', 'patron_id', 'visit_date', 'foodbank_id', 'is_food_truck', 'first_visit_this_month'
+    )
+
+    to_set, to_clear, changed = [], [], set()
+    previous = None
+    for pk, patron_id, visit_date, foodbank, is_food_truck, flag in rows.iterator(chunk_size=2000):
+        key = (patron_id, visit_date.replace(day=1))
+        first = key != previous
+        previous = key
+        if flag != first:
+            (to_set if first else to_clear).append(pk)
+            changed.add((foodbank, visit_date, is_food_truck))
+
+    with transaction.atomic():
+        for ids, flag in ((to_set, True), (to_clear, False)):
+            for i in range(0, len(ids), 1000):
+                Visit.objects.filter(pk__in=ids[i:i + 1000]).update(first_visit_this_month=flag)
+
+    return changed
+
+
+def rebuild_first_visit_flags(foodbank_id=None):
+    """Correct first_visit_this_month on every identified visit (of one foodbank, if given)"""
+    visits = Visit.objects.all()
+    if foodbank_id:
+        visits = visits.filter(patron__foodbank_id=foodbank_id)
+    return fix_first_visit_flags(visits)
+
+
+def sync_patron_month_range(patron_ids, start, end):
+    """
+    Batch version of sync_patron_months for every month from `start` to `end`
+    of many patrons at once, e.g. after bulk inserting visits. Returns the
+    rollup keys of visits whose first_visit_this_month flag changed.
+    """
+    visits = Visit.objects.filter(
+        patron_id__in=patron_ids,
+        visit_date__gte=start.replace(day=1),
+        visit_date__lt=next_month(end.replace(day=1)),
+    )
+    counters = compute_patron_counters(visits)
+
+    with transaction.atomic():
+        PatronMonthlyVisits.objects.filter(
+            patron_id__in=patron_ids, month__gte=start.replace(day=1), month__lte=end
+        ).delete()
+        PatronMonthlyVisits.objects.bulk_create(counters, batch_size=1000)
+        return fix_first_visit_flags(visits)
+
+
+def refresh_last_visits(patron_ids):
+    """
+    Copy each patron's latest visit onto their last-visit snapshot (cleared
+    if they have none left) and bump updated_date so roster deltas see it
+    """
+    for patron_id in patron_ids:
+        latest = Visit.objects.filter(patron_id=patron_id).order_by('-visit_date', '-id').values(
+            *LAST_VISIT_FIELDS.values()
+        ).first() or {}
+        Patron.objects.filter(pk=patron_id).update(
+            updated_date=timezone.now(),
+            **{field: latest.get(source) for field, source in LAST_VISIT_FIELDS.items()}
+        )
+
+
+def rebuild_last_visits(foodbank_id=None, patron_ids=None):
+    """Recompute every patron's (or just some) last-visit snapshot in a single UPDATE"""
+    latest = Visit.objects.filter(patron=OuterRef('pk')).order_by('-visit_date', '-id')
+    patrons = Patron.objects.all()
+    if foodbank_id:
+        patrons = patrons.filter(foodbank_id=foodbank_id)
+    if patron_ids is not None:
+        patrons = patrons.filter(pk__in=patron_ids)
+    return patrons.update(**{
+        field: Subquery(latest.values(source)[:1]) for field, source in LAST_VISIT_FIELDS.items()
+    })
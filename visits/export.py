@@ -0,0 +1,187 @@
+# visits/export.py
+import csv
+import io
+import tempfile
+from datetime import date
+
+from django.db.models import Q
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils.text import slugify
+
+from .models import Visit
+
+# Visits read per query
+EXPORT_CHUNK_SIZE = 2000
+
+# The CSV is sent to the client in pieces of about this size
+CSV_FLUSH_BYTES = 64 * 1024
+
+# Excel can't open a sheet of more than 1,048,576 rows, so long exports continue on another sheet
+XLSX_ROWS_PER_SHEET = 1000000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+EXPORT_COLUMNS = (
+    ('Visit ID', 'id'),
+    ('Foodbank', 'foodbank__name'),
+    ('Date', 'visit_date'),
+    ('Food Truck', 'is_food_truck'),
+    ('Patron ID', 'patron_id'),
+    ('First Name', 'patron_first_name'),
+    ('Last Name', 'patron_last_name'),
+    ('Address', 'patron_address'),
+    ('City', 'city'),
+    ('State', 'state'),
+    ('Zip Code', 'zipcode'),
+    ('Household Size', 'household_size'),
+    ('Ages 0-18', 'age_0_18'),
+    ('Ages 19-59', 'age_19_59'),
+    ('Ages 60+', 'age_60_plus'),
+    ('First Visit This Month', 'first_visit_this_month'),
+    ('Comments', 'comments'),
+)
+
+
+def export_visits(foodbank_ids, start=None, end=None, visit_type=None):
+    """Visits of the given foodbanks, optionally between two dates and of one type ('pantry' or 'food_truck')"""
+    visits = Visit.objects.filter(foodbank_id__in=foodbank_ids)
+    if start:
+        visits = visits.filter(visit_date__gte=start)
+    if end:
+        visits = visits.filter(visit_date__lte=end)
+    if visit_type == 'pantry':
+        visits = visits.filter(is_food_truck=False)
+    elif visit_type == 'food_truck':
+        visits = visits.filter(is_food_truck=True)
+    return visits
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(visits, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the header and then a row per visit, oldest first.
+
+    The visits are read in pages seeked by (visit_date, id) rather than with
+    one iterator() query: MySQL's driver buffers a whole result set in memory
+    even then, and paging keeps memory flat however many years are exported.
+    """
+    yield [header for header, field in EXPORT_COLUMNS]
+
+    fields = [field for header, field in EXPORT_COLUMNS]
+    date_index, pk_index = fields.index('visit_date'), fields.index('id')
+    visits = visits.order_by('visit_date', 'id').values_list(*fields)
+
+    page = visits
+    while True:
+        rows = list(page[:chunk_size])
+        for row in rows:
+            yield [format_value(value) for value in row]
+        if len(rows) < chunk_size:
+            return
+
+        last_date, last_pk = rows[-1][date_index], rows[-1][pk_index]
+        # The redundant visit_date bound lets the database seek straight to the page in the index
+        page = visits.filter(visit_date__gte=last_date).filter(
+            Q(visit_date__gt=last_date) |
+            Q(visit_date=last_date, pk__gt=last_pk)
+        )
+
+
+def csv_chunks(rows):
+    """Encode rows as CSV text, yielded a piece at a time for a streaming response"""
+    buffer = io.StringIO()
+    buffer.write('﻿')  # Byte order mark, so Excel reads the file as UTF-8
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xlsx_supported():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_xlsx(rows, file):
+    """
+    Write rows to an .xlsx file. openpyxl's write-only mode spools rows to
+    disk as they're appended, so memory stays flat here too.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    workbook = Workbook(write_only=True)
+    rows = iter(rows)
+    header = next(rows)
+    sheet, sheet_rows = None, XLSX_ROWS_PER_SHEET
+
+    for row in rows:
+        if sheet_rows == XLSX_ROWS_PER_SHEET:
+            sheet = workbook.create_sheet(f'Visits {len(workbook.worksheets) + 1}' if sheet else 'Visits')
+            sheet.append(header)
+            sheet_rows = 0
+        # Control characters pasted into comments aren't allowed in the XML
+        sheet.append([ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value for value in row])
+        sheet_rows += 1
+
+    if sheet is None:
+        workbook.create_sheet('Visits').append(header)
+    workbook.save(file)
+
+
+def export_filename(name, start, end):
+    parts = ['visits', slugify(name)]
+    if start or end:
+        parts.append(f"{start or 'start'}_to_{end or 'today'}")
+    return '_'.join(parts)
+
+
+def export_download(request, foodbank_ids, name, start=None, end=None):
+    """
+    Response with the visits of the given foodbanks as a CSV or XLSX download,
+    filtered by the request's ?start=, ?end= (YYYY-MM-DD, overriding the
+    `start` and `end` given) and ?visit_type=. The CSV streams as it's read;
+    the XLSX is built in a temporary file first.
+    """
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else start
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else end
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Dates must be YYYY-MM-DD'}, status=400)
+
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in ('csv', 'xlsx'):
+        return JsonResponse({'success': False, 'error': f"Unsupported format '{file_format}'"}, status=400)
+    if file_format == 'xlsx' and not xlsx_supported():
+        return JsonResponse({'success': False, 'error': 'XLSX export is not available; use CSV'}, status=400)
+
+    rows = export_rows(export_visits(foodbank_ids, start, end, request.GET.get('visit_type')))
+    filename = f'{export_filename(name, start, end)}.{file_format}'
+
+    if file_format == 'xlsx':
+        file = tempfile.TemporaryFile()
+        write_xlsx(rows, file)
+        file.seek(0)
+        return FileResponse(file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+    response = StreamingHttpResponse(csv_chunks(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
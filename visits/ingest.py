@@ -0,0 +1,198 @@
+# visits/ingest.py
+import csv
+import io
+import json
+import uuid
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from foodbanked.utils import get_foodbank_today
+from .counters import rebuild_last_visits, sync_patron_month_range
+from .forms import VisitForm
+from .models import Patron, Visit
+from .rollups import compute_rollups, save_rollups
+from .stats import invalidate_dashboard_statistics
+
+# Largest batch accepted in one request or file
+MAX_BATCH_SIZE = 5000
+
+# Spellings of true/false accepted for the checkbox columns of a CSV
+BOOLEAN_FIELDS = ('first_visit_this_month', 'is_food_truck')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', 'x'}
+
+
+class VisitBatchError(Exception):
+    """The batch couldn't be read at all (bad JSON/CSV, too many rows)"""
+
+
+def parse_visit_batch(content, file_format):
+    """Read a batch of visit rows from JSON (a list, or {"visits": [...]}) or CSV with a header row"""
+    if file_format == 'json':
+        try:
+            rows = json.loads(content)
+        except ValueError as e:
+            raise VisitBatchError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get('visits')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise VisitBatchError('Expected a list of visits')
+    elif file_format == 'csv':
+        rows = list(csv.DictReader(io.StringIO(content)))
+    else:
+        raise VisitBatchError(f"Unsupported format '{file_format}'")
+
+    if len(rows) > MAX_BATCH_SIZE:
+        raise VisitBatchError(f"At most {MAX_BATCH_SIZE} visits per batch")
+    return rows
+
+
+def clean_boolean(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def validate_visit_batch(foodbank, rows, missing_patron_anonymous=False):
+    """
+    Check every row with the visit form's rules. Returns (visits, errors): unsaved
+    Visit objects, and a list of {'row': n, 'errors': {...}} (rows numbered from 1).
+
+    A row naming a patron the food bank doesn't have is an error, unless
+    missing_patron_anonymous is set: then it's recorded as an anonymous visit,
+    as the intake form does.
+    """
+    today = get_foodbank_today(foodbank)
+
+    # Resolve every referenced patron in one query
+    patron_ids = set()
+    for row in rows:
+        try:
+            patron_ids.add(int(row.get('patron_id') or 0))
+        except (TypeError, ValueError):
+            pass
+    patrons = Patron.objects.filter(foodbank=foodbank).in_bulk(patron_ids - {0})
+
+    visits, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        data = {key: value for key, value in row.items() if value is not None}
+        for field in BOOLEAN_FIELDS:
+            data[field] = clean_boolean(data.get(field, False))
+
+        form = VisitForm(data)
+        row_errors = {} if form.is_valid() else {field: list(messages) for field, messages in form.errors.items()}
+
+        visit_date = None
+        try:
+            visit_date = date.fromisoformat(str(row.get('visit_date', '')).strip())
+        except ValueError:
+            row_errors['visit_date'] = ['Enter the visit date as YYYY-MM-DD.']
+        if visit_date and visit_date > today:
+            row_errors['visit_date'] = ['Visit date is in the future.']
+
+        patron = None
+        if form.is_valid() and form.cleaned_data.get('patron_id'):
+            patron = patrons.get(form.cleaned_data['patron_id'])
+            if patron is None and not missing_patron_anonymous:
+                row_errors['patron_id'] = ['No such patron at this food bank.']
+
+        if form.is_valid() and form.cleaned_data['is_food_truck'] and not foodbank.food_truck_enabled:
+            row_errors['is_food_truck'] = ['Food truck visits are not enabled for this food bank.']
+
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+
+        visit = form.save(commit=False)
+        visit.foodbank = foodbank
+        visit.visit_date = visit_date
+        if patron:
+            visit.patron = patron
+            visit.patron_first_name = patron.first_name
+            visit.patron_last_name = patron.last_name
+            visit.patron_address = patron.address
+        visits.append(visit)
+
+    return visits, errors
+
+
+def save_visit_batch(foodbank, visits, ignore_conflicts=False):
+    """
+    Insert validated visits with one bulk_create, bypassing the per-visit
+    signals, then update the daily rollups, patron counters, first-visit
+    flags and last-visit snapshots they affect once for the whole batch.
+    """
+    with transaction.atomic():
+        Visit.objects.bulk_create(visits, batch_size=500, ignore_conflicts=ignore_conflicts)
+
+        dates = {visit.visit_date for visit in visits}
+        patron_ids = {visit.patron_id for visit in visits if visit.patron_id}
+        if patron_ids:
+            flipped = sync_patron_month_range(patron_ids, min(dates), max(dates))
+            dates |= {visit_date for _, visit_date, _ in flipped}
+            rebuild_last_visits(patron_ids=patron_ids)
+            Patron.objects.filter(pk__in=patron_ids).update(updated_date=timezone.now())
+
+        save_rollups(compute_rollups(Visit.objects.filter(foodbank=foodbank, visit_date__in=dates)))
+
+    invalidate_dashboard_statistics(foodbank, visit_dates=dates)
+
+
+def ingest_visits(foodbank, rows):
+    """
+    Validate and insert a batch of visits, all or nothing.
+    Returns (number created, errors); nothing is saved if any row has errors.
+    """
+    visits, errors = validate_visit_batch(foodbank, rows)
+    if errors or not visits:
+        return 0, errors
+
+    save_visit_batch(foodbank, visits)
+    return len(visits), []
+
+
+def sync_visits(foodbank, rows):
+    """
+    Record visits queued offline by the intake page. Every row carries a
+    client_uuid, and visits already recorded under theirs are skipped, so a
+    batch can be resent safely after a dropped connection.
+
+    Unlike ingest_visits, valid rows are saved even if others are rejected:
+    one bad entry mustn't hold up the rest of the queue. A visit whose patron
+    was deleted while it waited is recorded as anonymous, as the intake form
+    would have recorded it, rather than lost. Returns (synced,
+    rejected): the client_uuids now recorded, and {'client_uuid', 'errors'}
+    for each row that never will be.
+    """
+    rejected, pending = [], {}
+    for row in rows:
+        try:
+            client_uuid = str(uuid.UUID(str(row.get('client_uuid'))))
+        except ValueError:
+            rejected.append({'client_uuid': row.get('client_uuid'), 'errors': {'client_uuid': ['Missing or invalid.']}})
+            continue
+        pending.setdefault(client_uuid, row)
+
+    recorded = set(
+        str(value) for value in Visit.objects.filter(client_uuid__in=pending).values_list('client_uuid', flat=True)
+    )
+    new_uuids = [client_uuid for client_uuid in pending if client_uuid not in recorded]
+
+    visits, errors = validate_visit_batch(
+        foodbank, [pending[client_uuid] for client_uuid in new_uuids], missing_patron_anonymous=True
+    )
+    invalid = set()
+    for error in errors:
+        client_uuid = new_uuids[error['row'] - 1]
+        invalid.add(client_uuid)
+        rejected.append({'client_uuid': client_uuid, 'errors': error['errors']})
+
+    valid_uuids = [client_uuid for client_uuid in new_uuids if client_uuid not in invalid]
+    for visit, client_uuid in zip(visits, valid_uuids):
+        visit.client_uuid = client_uuid
+    if visits:
+        # A concurrent retry of the same batch may insert some of these first; skip those
+        save_visit_batch(foodbank, visits, ignore_conflicts=True)
+
+    return sorted(recorded) + valid_uuids, rejected
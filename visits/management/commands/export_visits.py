@@ -0,0 +1,68 @@
+import sys
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Foodbank, FoodbankOrganization
+from visits.export import csv_chunks, export_rows, export_visits, write_xlsx, xlsx_supported
+
+
+class Command(BaseCommand):
+    help = "Export visits of one or more foodbanks, or a whole organization, to CSV or XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foodbank', type=int, action='append', default=[], help="Foodbank ID (repeatable)")
+        parser.add_argument('--organization', help="Export every member foodbank of this organization slug")
+        parser.add_argument('--start', type=date.fromisoformat, help="First visit date (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last visit date (YYYY-MM-DD)")
+        parser.add_argument('--visit-type', choices=['pantry', 'food_truck'], help="Only this visit type")
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help="Defaults to the output file's extension, else CSV")
+        parser.add_argument('--output', '-o', help="File to write (CSV goes to stdout if omitted)")
+
+    def handle(self, *args, **options):
+        foodbank_ids = list(options['foodbank'])
+        if options['organization']:
+            try:
+                organization = FoodbankOrganization.objects.get(slug=options['organization'])
+            except FoodbankOrganization.DoesNotExist:
+                raise CommandError(f"Organization '{options['organization']}' does not exist")
+            foodbank_ids += organization.foodbanks.values_list('pk', flat=True)
+        if not foodbank_ids:
+            raise CommandError("Give at least one --foodbank or an --organization")
+
+        missing = set(foodbank_ids) - set(Foodbank.objects.filter(pk__in=foodbank_ids).values_list('pk', flat=True))
+        if missing:
+            raise CommandError(f"Foodbank {', '.join(map(str, sorted(missing)))} does not exist")
+
+        output = options['output']
+        file_format = options['format'] or ('xlsx' if output and output.lower().endswith('.xlsx') else 'csv')
+        if file_format == 'xlsx':
+            if not output:
+                raise CommandError("XLSX exports need --output")
+            if not xlsx_supported():
+                raise CommandError("XLSX export needs openpyxl (pip install openpyxl)")
+
+        visits = export_visits(foodbank_ids, options['start'], options['end'], options['visit_type'])
+        started = time.monotonic()
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                yield row
+                count += 1
+
+        rows = counted(export_rows(visits))
+        if file_format == 'xlsx':
+            write_xlsx(rows, output)
+        elif output:
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                f.writelines(csv_chunks(rows))
+        else:
+            sys.stdout.writelines(csv_chunks(rows))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Exported {count - 1} visits to {output} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,51 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Foodbank
+from visits.ingest import VisitBatchError, ingest_visits, parse_visit_batch, validate_visit_batch
+
+
+class Command(BaseCommand):
+    help = "Import a JSON or CSV file of visits with explicit dates (all or nothing)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('foodbank', type=int, help="Foodbank ID the visits belong to")
+        parser.add_argument('file', help="Visits as a .json list or a .csv with a header row")
+        parser.add_argument('--format', choices=['json', 'csv'], help="File format (defaults to the file extension)")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the file without saving anything")
+
+    def handle(self, *args, **options):
+        try:
+            foodbank = Foodbank.objects.get(pk=options['foodbank'])
+        except Foodbank.DoesNotExist:
+            raise CommandError(f"Foodbank {options['foodbank']} does not exist")
+
+        path = Path(options['file'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        try:
+            rows = parse_visit_batch(path.read_text(encoding='utf-8-sig'), file_format)
+        except OSError as e:
+            raise CommandError(f"Can't read {path}: {e}")
+        except VisitBatchError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        if options['dry_run']:
+            visits, errors = validate_visit_batch(foodbank, rows)
+            created = 0
+        else:
+            created, errors = ingest_visits(foodbank, rows)
+
+        for error in errors:
+            details = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error['errors'].items())
+            self.stdout.write(f"  ✗ Row {error['row']}: {details}")
+        if errors:
+            raise CommandError(f"{len(errors)} of {len(rows)} visits are invalid; nothing was imported")
+
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"✓ All {len(visits)} visits are valid (dry run, nothing saved)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Imported {created} visits into {foodbank.name} in {elapsed:.1f}s"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from visits.counters import rebuild_first_visit_flags, rebuild_patron_counters
+from visits.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild every patron's monthly visit counters from their visit history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foodbank', type=int, help="Only rebuild counters of this foodbank ID's patrons")
+        parser.add_argument(
+            '--fix-flags', action='store_true',
+            help="Also reset first_visit_this_month on past visits to each patron's earliest visit of the month"
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_patron_counters(foodbank_id=options['foodbank'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt {count} patron monthly counters"))
+
+        if options['fix_flags']:
+            changed = rebuild_first_visit_flags(foodbank_id=options['foodbank'])
+            if changed:
+                # The rollups count first visits, so rebuild the range the corrections span
+                dates = [date for _, date, _ in changed]
+                rebuild_rollups(start=min(dates), end=max(dates), foodbank_id=options['foodbank'])
+            self.stdout.write(self.style.SUCCESS(f"✓ Corrected first-visit flags on {len(changed)} days"))
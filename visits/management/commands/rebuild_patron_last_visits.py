@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from visits.counters import rebuild_last_visits
+
+
+class Command(BaseCommand):
+    help = "Recompute every patron's last-visit snapshot (used to prefill the intake form) from their visits"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foodbank', type=int, help="Only rebuild patrons of this foodbank ID")
+
+    def handle(self, *args, **options):
+        count = rebuild_last_visits(foodbank_id=options['foodbank'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt the last-visit snapshot of {count} patrons"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from visits.models import Patron
+from visits.search import index_patrons
+
+
+class Command(BaseCommand):
+    help = "Rebuild the patron typeahead search tokens (and trigrams, if enabled)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foodbank', type=int, help="Only rebuild patrons of this foodbank ID")
+        parser.add_argument('--batch-size', type=int, default=500, help="Patrons indexed per transaction")
+
+    def handle(self, *args, **options):
+        patrons = Patron.objects.order_by('pk')
+        if options['foodbank']:
+            patrons = patrons.filter(foodbank_id=options['foodbank'])
+
+        batch_size = options['batch_size']
+        total_patrons = total_tokens = total_grams = 0
+        last_pk = 0
+
+        while True:
+            batch = list(patrons.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            tokens, grams = index_patrons(batch)
+            total_patrons += len(batch)
+            total_tokens += tokens
+            total_grams += grams
+            last_pk = batch[-1].pk
+            self.stdout.write(f"  Indexed {total_patrons} patrons...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Indexed {total_patrons} patrons ({total_tokens} tokens, {total_grams} trigrams)"
+        ))
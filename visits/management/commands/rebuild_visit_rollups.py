@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visits.rollups import rebuild_rollups
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily visit rollups from raw visits (all dates unless a range is given)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--foodbank', type=int, help="Only rebuild rollups of this foodbank ID")
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start'])
+        end = parse_date(options['end'])
+        if start and end and start > end:
+            raise CommandError("--start must be on or before --end")
+
+        count = rebuild_rollups(start=start, end=end, foodbank_id=options['foodbank'])
+
+        date_range = f"{start or 'the first visit'} to {end or 'the last visit'}"
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt {count} daily rollups from {date_range}"))
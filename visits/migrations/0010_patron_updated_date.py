@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0013_foodbank_description_foodbank_is_public_and_more"),
+        ("visits", "0009_alter_visit_visit_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patron",
+            name="updated_date",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="patron",
+            index=models.Index(
+                fields=["foodbank", "updated_date"],
+                name="visits_patr_foodban_23636d_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,177 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:10
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the tokenization in visits.search as of this migration, so
+# later changes there don't change what the migration does
+TRIGRAM_FIELDS = ("last_name", "first_name", "address")
+
+
+def normalize_tokens(value):
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return [t[:100] for t in re.split(r"[^a-z0-9]+", value.lower()) if t]
+
+
+def digits_only(value):
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def patron_tokens(patron):
+    tokens = set()
+    for field in ("last_name", "first_name", "address"):
+        for token in normalize_tokens(getattr(patron, field)):
+            tokens.add((field, token))
+    phone = digits_only(patron.phone)
+    if phone:
+        for token in {phone, phone[-7:], phone[-4:]}:
+            tokens.add(("phone", token))
+    zipcode = digits_only(patron.zipcode)
+    if zipcode:
+        tokens.add(("zipcode", zipcode))
+    return tokens
+
+
+def token_trigrams(token):
+    return {token[i : i + 3] for i in range(len(token) - 2)}
+
+
+def index_existing_patrons(apps, schema_editor):
+    Patron = apps.get_model("visits", "Patron")
+    PatronSearchToken = apps.get_model("visits", "PatronSearchToken")
+    PatronSearchGram = apps.get_model("visits", "PatronSearchGram")
+    use_trigrams = getattr(settings, "PATRON_SEARCH_TRIGRAMS", False)
+
+    token_rows = []
+    gram_rows = []
+    for patron in Patron.objects.iterator(chunk_size=1000):
+        tokens = patron_tokens(patron)
+        token_rows.extend(
+            PatronSearchToken(
+                foodbank_id=patron.foodbank_id,
+                patron_id=patron.pk,
+                field=field,
+                token=token,
+            )
+            for field, token in tokens
+        )
+        if use_trigrams:
+            grams = set()
+            for field, token in tokens:
+                if field in TRIGRAM_FIELDS:
+                    grams |= token_trigrams(token)
+            gram_rows.extend(
+                PatronSearchGram(
+                    foodbank_id=patron.foodbank_id, patron_id=patron.pk, gram=gram
+                )
+                for gram in grams
+            )
+
+    PatronSearchToken.objects.bulk_create(token_rows, batch_size=1000)
+    PatronSearchGram.objects.bulk_create(gram_rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0013_foodbank_description_foodbank_is_public_and_more"),
+        ("visits", "0010_patron_updated_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatronSearchGram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("gram", models.CharField(max_length=3)),
+                (
+                    "foodbank",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="accounts.foodbank",
+                    ),
+                ),
+                (
+                    "patron",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_grams",
+                        to="visits.patron",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["foodbank", "gram", "patron"],
+                        name="visits_patr_foodban_ba51b0_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PatronSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "field",
+                    models.CharField(
+                        choices=[
+                            ("last_name", "Last Name"),
+                            ("first_name", "First Name"),
+                            ("phone", "Phone"),
+                            ("zipcode", "Zip Code"),
+                            ("address", "Address"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("token", models.CharField(max_length=100)),
+                (
+                    "foodbank",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="accounts.foodbank",
+                    ),
+                ),
+                (
+                    "patron",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="visits.patron",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["foodbank", "field", "token", "patron"],
+                        name="visits_patr_foodban_c2e8ac_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(index_existing_patrons, migrations.RunPython.noop),
+    ]
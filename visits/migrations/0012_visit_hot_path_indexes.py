@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0013_foodbank_description_foodbank_is_public_and_more"),
+        ("visits", "0011_patron_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="visit",
+            index=models.Index(
+                fields=["foodbank", "visit_date"], name="visits_visi_foodban_2ca16b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="visit",
+            index=models.Index(
+                fields=["foodbank", "is_food_truck", "visit_date"],
+                name="visits_visi_foodban_1fe468_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="visit",
+            index=models.Index(
+                fields=["patron", "visit_date", "id"],
+                name="visits_visi_patron__ef368b_idx",
+            ),
+        ),
+    ]
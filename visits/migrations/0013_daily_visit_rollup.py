@@ -0,0 +1,105 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_existing_rollups(apps, schema_editor):
+    # A frozen copy of visits.rollups.compute_rollups as of this migration, so
+    # later changes to it don't change what this migration does
+    Visit = apps.get_model("visits", "Visit")
+    DailyVisitRollup = apps.get_model("visits", "DailyVisitRollup")
+    visits = Visit.objects.order_by()
+    key_fields = ("foodbank_id", "visit_date", "is_food_truck")
+
+    totals = visits.values(*key_fields).annotate(
+        visit_count=models.Count("id"),
+        people_served=models.Sum("household_size"),
+        age_0_18_total=models.Sum("age_0_18"),
+        age_19_59_total=models.Sum("age_19_59"),
+        age_60_plus_total=models.Sum("age_60_plus"),
+        first_time_visitors=models.Count(
+            "id", filter=models.Q(first_visit_this_month=True)
+        ),
+        identified_visits=models.Count("id", filter=models.Q(patron__isnull=False)),
+    )
+
+    rollups = {}
+    for row in totals:
+        key = tuple(row[field] for field in key_fields)
+        rollups[key] = DailyVisitRollup(
+            foodbank_id=row["foodbank_id"],
+            date=row["visit_date"],
+            is_food_truck=row["is_food_truck"],
+            visit_count=row["visit_count"],
+            people_served=row["people_served"] or 0,
+            age_0_18=row["age_0_18_total"] or 0,
+            age_19_59=row["age_19_59_total"] or 0,
+            age_60_plus=row["age_60_plus_total"] or 0,
+            first_time_visitors=row["first_time_visitors"],
+            identified_visits=row["identified_visits"],
+            anonymous_visits=row["visit_count"] - row["identified_visits"],
+            zipcode_counts={},
+            household_size_counts={},
+        )
+
+    for field, breakdown in (
+        ("zipcode", "zipcode_counts"),
+        ("household_size", "household_size_counts"),
+    ):
+        for row in visits.values(*key_fields, field).annotate(count=models.Count("id")):
+            rollup = rollups[tuple(row[f] for f in key_fields)]
+            getattr(rollup, breakdown)[str(row[field])] = row["count"]
+
+    DailyVisitRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0013_foodbank_description_foodbank_is_public_and_more"),
+        ("visits", "0012_visit_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyVisitRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("is_food_truck", models.BooleanField(default=False)),
+                ("visit_count", models.IntegerField(default=0)),
+                ("people_served", models.IntegerField(default=0)),
+                ("age_0_18", models.IntegerField(default=0)),
+                ("age_19_59", models.IntegerField(default=0)),
+                ("age_60_plus", models.IntegerField(default=0)),
+                ("first_time_visitors", models.IntegerField(default=0)),
+                ("identified_visits", models.IntegerField(default=0)),
+                ("anonymous_visits", models.IntegerField(default=0)),
+                ("zipcode_counts", models.JSONField(blank=True, default=dict)),
+                ("household_size_counts", models.JSONField(blank=True, default=dict)),
+                ("updated_date", models.DateTimeField(auto_now=True)),
+                (
+                    "foodbank",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="accounts.foodbank",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+                "unique_together": {("foodbank", "date", "is_food_truck")},
+            },
+        ),
+        migrations.RunPython(build_existing_rollups, migrations.RunPython.noop),
+    ]
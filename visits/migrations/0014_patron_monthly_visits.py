@@ -0,0 +1,64 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def build_existing_counters(apps, schema_editor):
+    # Frozen copy of visits.counters.compute_patron_counters when this
+    # migration was written: one grouped query over historical models
+    Visit = apps.get_model("visits", "Visit")
+    PatronMonthlyVisits = apps.get_model("visits", "PatronMonthlyVisits")
+    rows = (
+        Visit.objects.filter(patron__isnull=False)
+        .order_by()
+        .annotate(month=TruncMonth("visit_date"))
+        .values("patron_id", "month")
+        .annotate(
+            visit_count=models.Count("id"), last_visit_date=models.Max("visit_date")
+        )
+    )
+    PatronMonthlyVisits.objects.bulk_create(
+        [PatronMonthlyVisits(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("visits", "0013_daily_visit_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatronMonthlyVisits",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("visit_count", models.IntegerField(default=0)),
+                ("last_visit_date", models.DateField()),
+                (
+                    "patron",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_visits",
+                        to="visits.patron",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+                "unique_together": {("patron", "month")},
+            },
+        ),
+        migrations.RunPython(build_existing_counters, migrations.RunPython.noop),
+    ]
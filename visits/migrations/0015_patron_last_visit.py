@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+# Patron's last-visit fields and the visit fields they're copied from, as
+# visits.counters.LAST_VISIT_FIELDS was when this migration was written
+LAST_VISIT_FIELDS = {
+    "last_visit_date": "visit_date",
+    "last_zipcode": "zipcode",
+    "last_household_size": "household_size",
+    "last_age_0_18": "age_0_18",
+    "last_age_19_59": "age_19_59",
+    "last_age_60_plus": "age_60_plus",
+}
+
+
+def build_last_visits(apps, schema_editor):
+    # Every patron's snapshot from their latest visit, in a single UPDATE
+    Patron = apps.get_model("visits", "Patron")
+    Visit = apps.get_model("visits", "Visit")
+    latest = Visit.objects.filter(patron=models.OuterRef("pk")).order_by(
+        "-visit_date", "-id"
+    )
+    Patron.objects.update(
+        **{
+            field: models.Subquery(latest.values(source)[:1])
+            for field, source in LAST_VISIT_FIELDS.items()
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("visits", "0014_patron_monthly_visits"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patron",
+            name="last_age_0_18",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="patron",
+            name="last_age_19_59",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="patron",
+            name="last_age_60_plus",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="patron",
+            name="last_household_size",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="patron",
+            name="last_visit_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="patron",
+            name="last_zipcode",
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.RunPython(build_last_visits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("visits", "0015_patron_last_visit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="visit",
+            name="client_uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
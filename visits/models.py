@@ -1,5 +1,5 @@
 # visits/models.py
-from django.db import models
+from django.db import models, transaction
 from accounts.models import Foodbank
 
 class Patron(models.Model):
@@ -14,13 +14,67 @@ class Patron(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     created_date = models.DateTimeField(auto_now_add=True)
     
+    # Bumped on any patron edit and whenever one of their visits changes,
+    # so the intake roster can sync only what changed
+    updated_date = models.DateTimeField(auto_now=True)
+    
     comments = models.TextField(blank=True, null=True)
+    
+    # Copy of the latest visit, used to prefill the intake form (kept current by visits.counters)
+    last_visit_date = models.DateField(blank=True, null=True)
+    last_zipcode = models.CharField(max_length=10, blank=True, null=True)
+    last_household_size = models.IntegerField(blank=True, null=True)
+    last_age_0_18 = models.IntegerField(blank=True, null=True)
+    last_age_19_59 = models.IntegerField(blank=True, null=True)
+    last_age_60_plus = models.IntegerField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.zipcode}"
     
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['foodbank', 'updated_date']),
+        ]
+
+
+class PatronSearchToken(models.Model):
+    """Normalized search token for patron typeahead (built by visits.search)"""
+    FIELD_CHOICES = [
+        ('last_name', 'Last Name'),
+        ('first_name', 'First Name'),
+        ('phone', 'Phone'),
+        ('zipcode', 'Zip Code'),
+        ('address', 'Address'),
+    ]
+    
+    foodbank = models.ForeignKey(Foodbank, on_delete=models.CASCADE)
+    patron = models.ForeignKey(Patron, on_delete=models.CASCADE, related_name='search_tokens')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    token = models.CharField(max_length=100)
+    
+    def __str__(self):
+        return f"{self.token} ({self.field})"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['foodbank', 'field', 'token', 'patron']),
+        ]
+
+
+class PatronSearchGram(models.Model):
+    """Trigram of a patron's search tokens, used for infix typeahead matches"""
+    foodbank = models.ForeignKey(Foodbank, on_delete=models.CASCADE)
+    patron = models.ForeignKey(Patron, on_delete=models.CASCADE, related_name='search_grams')
+    gram = models.CharField(max_length=3)
+    
+    def __str__(self):
+        return self.gram
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['foodbank', 'gram', 'patron']),
+        ]
 
 
 class Visit(models.Model):
@@ -47,9 +101,84 @@ class Visit(models.Model):
 
     is_food_truck = models.BooleanField(default=False)
     
+    # Generated by the intake page when it queues a visit, so a retried sync can't record it twice
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which daily rollup the visit was counted in, so an edit that
+        # moves it to another day or visit type can refresh both rollups
+        if {'foodbank_id', 'visit_date', 'is_food_truck'} <= set(field_names):
+            instance._loaded_rollup_key = (instance.foodbank_id, instance.visit_date, instance.is_food_truck)
+        # Likewise for the patron's monthly counter
+        if {'patron_id', 'visit_date'} <= set(field_names) and instance.patron_id:
+            instance._loaded_counter_key = (instance.patron_id, instance.visit_date.replace(day=1))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # The post_save handlers in visits.signals update the patron's counters,
+        # first-visit flags and snapshot and the daily rollups; running them in
+        # the same transaction as the write means they commit or fail together
+        # (delete() already sends post_delete inside its transaction)
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+    
     def __str__(self):
         patron_name = self.patron.name if self.patron else "Anonymous"
         return f"{patron_name} - {self.visit_date}"
     
     class Meta:
-        ordering = ['-visit_date']
\ No newline at end of file
+        ordering = ['-visit_date']
+        indexes = [
+            # Month-to-date and date-range stats for a foodbank
+            models.Index(fields=['foodbank', 'visit_date']),
+            # Pantry vs food truck breakdowns and the intake page's today list
+            models.Index(fields=['foodbank', 'is_food_truck', 'visit_date']),
+            # A patron's visits this month and their latest visit
+            models.Index(fields=['patron', 'visit_date', 'id']),
+        ]
+
+class DailyVisitRollup(models.Model):
+    """Visit statistics for one foodbank, day and visit type (kept current by visits.rollups)"""
+    foodbank = models.ForeignKey(Foodbank, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    is_food_truck = models.BooleanField(default=False)
+    
+    visit_count = models.IntegerField(default=0)
+    people_served = models.IntegerField(default=0)
+    age_0_18 = models.IntegerField(default=0)
+    age_19_59 = models.IntegerField(default=0)
+    age_60_plus = models.IntegerField(default=0)
+    first_time_visitors = models.IntegerField(default=0)
+    identified_visits = models.IntegerField(default=0)
+    anonymous_visits = models.IntegerField(default=0)
+    
+    # Visit counts keyed by zipcode and by household size, e.g. {"83702": 12}
+    zipcode_counts = models.JSONField(default=dict, blank=True)
+    household_size_counts = models.JSONField(default=dict, blank=True)
+    
+    updated_date = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        visit_type = "Food Truck" if self.is_food_truck else "Pantry"
+        return f"{self.foodbank.name} - {self.date} ({visit_type}): {self.visit_count} visits"
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = [('foodbank', 'date', 'is_food_truck')]
+
+
+class PatronMonthlyVisits(models.Model):
+    """A patron's visit count for one month (kept current by visits.counters)"""
+    patron = models.ForeignKey(Patron, on_delete=models.CASCADE, related_name='monthly_visits')
+    month = models.DateField()  # First day of the month
+    visit_count = models.IntegerField(default=0)
+    last_visit_date = models.DateField()
+    
+    def __str__(self):
+        return f"{self.patron} - {self.month:%B %Y}: {self.visit_count} visits"
+    
+    class Meta:
+        ordering = ['-month']
+        unique_together = [('patron', 'month')]
@@ -0,0 +1,128 @@
+# visits/rollups.py
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import DailyVisitRollup, Visit
+
+# Statistics stored on every rollup row besides its key and breakdowns
+ROLLUP_STAT_FIELDS = (
+    'visit_count', 'people_served', 'age_0_18', 'age_19_59', 'age_60_plus',
+    'first_time_visitors', 'identified_visits', 'anonymous_visits',
+)
+
+ROLLUP_UNIQUE_FIELDS = ('foodbank', 'date', 'is_food_truck')
+
+
+def rollup_key(visit):
+    """The (foodbank_id, date, is_food_truck) rollup a visit is counted in"""
+    return (visit.foodbank_id, visit.visit_date, visit.is_food_truck)
+
+
+def compute_rollups(visits):
+    """
+    Build unsaved rollup rows for a queryset of visits.
+
+    Three grouped queries no matter how many visits are covered: the totals,
+    then the zipcode and household size breakdowns.
+    """
+    visits = visits.order_by()
+    key_fields = ('foodbank_id', 'visit_date', 'is_food_truck')
+
+    totals = visits.values(*key_fields).annotate(
+        visit_count=Count('id'),
+        people_served=Sum('household_size'),
+        age_0_18_total=Sum('age_0_18'),
+        age_19_59_total=Sum('age_19_59'),
+        age_60_plus_total=Sum('age_60_plus'),
+        first_time_visitors=Count('id', filter=Q(first_visit_this_month=True)),
+        identified_visits=Count('id', filter=Q(patron__isnull=False)),
+    )
+
+    rollups = {}
+    for row in totals:
+        key = tuple(row[field] for field in key_fields)
+        rollups[key] = DailyVisitRollup(
+            foodbank_id=row['foodbank_id'],
+            date=row['visit_date'],
+            is_food_truck=row['is_food_truck'],
+            visit_count=row['visit_count'],
+            people_served=row['people_served'] or 0,
+            age_0_18=row['age_0_18_total'] or 0,
+            age_19_59=row['age_19_59_total'] or 0,
+            age_60_plus=row['age_60_plus_total'] or 0,
+            first_time_visitors=row['first_time_visitors'],
+            identified_visits=row['identified_visits'],
+            anonymous_visits=row['visit_count'] - row['identified_visits'],
+            zipcode_counts={},
+            household_size_counts={},
+        )
+
+    # JSON object keys are always strings, so household sizes are stored as "1", "2", ...
+    for field, breakdown in (('zipcode', 'zipcode_counts'), ('household_size', 'household_size_counts')):
+        for row in visits.values(*key_fields, field).annotate(count=Count('id')):
+            rollup = rollups[tuple(row[f] for f in key_fields)]
+            getattr(rollup, breakdown)[str(row[field])] = row['count']
+
+    return list(rollups.values())
+
+
+def save_rollups(rollups):
+    """Insert rollup rows, overwriting any existing row for the same key"""
+    # MySQL's ON DUPLICATE KEY UPDATE can't name the conflicting unique key
+    unique_fields = ROLLUP_UNIQUE_FIELDS if connection.features.supports_update_conflicts_with_target else None
+    DailyVisitRollup.objects.bulk_create(
+        rollups,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=ROLLUP_STAT_FIELDS + ('zipcode_counts', 'household_size_counts', 'updated_date'),
+    )
+
+
+def refresh_rollups(keys):
+    """
+    Recompute the rollup rows for a set of (foodbank_id, date, is_food_truck) keys.
+
+    Each row is locked before its day is aggregated and stays locked until
+    the new totals are written, so two check-ins on the same day can't each
+    count the day without the other's visit and overwrite one another.
+    """
+    for foodbank_id, date, is_food_truck in sorted(keys):
+        key = {'foodbank_id': foodbank_id, 'date': date, 'is_food_truck': is_food_truck}
+        with transaction.atomic():
+            try:
+                DailyVisitRollup.objects.select_for_update().get(**key)
+            except DailyVisitRollup.DoesNotExist:
+                # The day's first visit: create the row so there's one to lock
+                DailyVisitRollup.objects.get_or_create(**key)
+                DailyVisitRollup.objects.select_for_update().get(**key)
+
+            visits = Visit.objects.filter(foodbank_id=foodbank_id, visit_date=date, is_food_truck=is_food_truck)
+            rollups = compute_rollups(visits)
+            if rollups:
+                save_rollups(rollups)
+            else:
+                DailyVisitRollup.objects.filter(**key).delete()
+
+
+def rebuild_rollups(start=None, end=None, foodbank_id=None):
+    """Replace every rollup row in a date range (inclusive) with fresh totals"""
+    visits = Visit.objects.all()
+    stale = DailyVisitRollup.objects.all()
+    if start:
+        visits = visits.filter(visit_date__gte=start)
+        stale = stale.filter(date__gte=start)
+    if end:
+        visits = visits.filter(visit_date__lte=end)
+        stale = stale.filter(date__lte=end)
+    if foodbank_id:
+        visits = visits.filter(foodbank_id=foodbank_id)
+        stale = stale.filter(foodbank_id=foodbank_id)
+
+    rollups = compute_rollups(visits)
+    with transaction.atomic():
+        stale.delete()
+        DailyVisitRollup.objects.bulk_create(rollups, batch_size=500)
+
+    return len(rollups)
+
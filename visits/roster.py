@@ -0,0 +1,111 @@
+# visits/roster.py
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.db.models import IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from foodbanked.utils import get_foodbank_today
+from .models import Patron, PatronMonthlyVisits
+
+# Bump whenever the shape of a roster row changes so clients drop their cached copy
+ROSTER_VERSION = 1
+
+# Deltas reach back a little past the watermark so rows committed by a write that
+# was in flight while the previous sync ran aren't missed; clients upsert by id
+ROSTER_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def build_patron_roster(foodbank, today=None, since=None):
+    """
+    Build the patron list used by the visit intake form.
+
+    Visits this month come from the patrons' monthly counters and the last
+    visit from their denormalized snapshot, so the whole roster is a single
+    query no matter how many patrons the foodbank has. Pass `since` to only
+    return patrons that were created or changed (including their visits) after it.
+    """
+    if today is None:
+        today = get_foodbank_today(foodbank)
+    month_start = today.replace(day=1)
+
+    patrons = Patron.objects.filter(foodbank=foodbank)
+    if since is not None:
+        patrons = patrons.filter(updated_date__gte=since - ROSTER_SYNC_OVERLAP)
+
+    month_visits = PatronMonthlyVisits.objects.filter(
+        patron=OuterRef('pk'),
+        month=month_start
+    ).values('visit_count')[:1]
+
+    rows = patrons.annotate(
+        visits_this_month=Coalesce(Subquery(month_visits, output_field=IntegerField()), 0),
+    ).values(
+        'id', 'first_name', 'last_name', 'address', 'city', 'state', 'zipcode',
+        'phone', 'comments', 'visits_this_month', 'last_visit_date', 'last_zipcode',
+        'last_household_size', 'last_age_0_18', 'last_age_19_59', 'last_age_60_plus',
+    )
+
+    return [serialize_roster_row(row) for row in rows]
+
+
+def sync_patron_roster(foodbank, since=None):
+    """
+    Roster payload for the intake form: a full snapshot, or the patrons changed
+    since the client's watermark.
+
+    A full snapshot is sent when there is no watermark or it predates the
+    current month, since every patron's visits_this_month resets then. A delta
+    also lists the ids of every current patron, so the client can drop the
+    deleted ones (a count alone misses a delete and an add between syncs).
+    """
+    watermark = timezone.now()
+    today = get_foodbank_today(foodbank)
+
+    full = since is None or since.astimezone(ZoneInfo(foodbank.timezone)).date() < today.replace(day=1)
+    patrons = build_patron_roster(foodbank, today=today, since=None if full else since)
+
+    payload = {
+        'version': ROSTER_VERSION,
+        'full': full,
+        'watermark': watermark.isoformat(),
+        'patrons': patrons,
+    }
+    if full:
+        payload['total'] = len(patrons)
+    else:
+        payload['ids'] = list(Patron.objects.filter(foodbank=foodbank).values_list('id', flat=True))
+        payload['total'] = len(payload['ids'])
+    return payload
+
+
+def serialize_roster_row(row):
+    """Convert an annotated patron row into the dict the intake form expects"""
+    patron_data = {
+        'id': row['id'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'address': row['address'] or '',
+        'city': row['city'] or '',
+        'state': row['state'] or '',
+        'zipcode': row['zipcode'],
+        'phone': row['phone'] or '',
+        'comments': row['comments'] or '',
+        'visits_this_month': row['visits_this_month'],
+    }
+
+    if row['last_visit_date']:
+        patron_data['last_visit_date'] = row['last_visit_date'].strftime('%Y-%m-%d')
+        patron_data['last_visit'] = {
+            'zipcode': row['last_zipcode'],
+            'household_size': row['last_household_size'],
+            'age_0_18': row['last_age_0_18'],
+            'age_19_59': row['last_age_19_59'],
+            'age_60_plus': row['last_age_60_plus'],
+        }
+    else:
+        patron_data['last_visit_date'] = None
+        patron_data['last_visit'] = None
+
+    return patron_data
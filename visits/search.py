@@ -0,0 +1,219 @@
+# visits/search.py
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from foodbanked.text import digits_only, normalize_tokens
+from .models import Patron, PatronSearchGram, PatronSearchToken
+
+# Characters a normalized token can contain, in the order every backend collation sorts them
+TOKEN_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# Fields that can be matched inside a word via trigrams (phones and zips only by prefix)
+TRIGRAM_FIELDS = ('last_name', 'first_name', 'address')
+
+
+def trigrams_enabled():
+    return getattr(settings, 'PATRON_SEARCH_TRIGRAMS', False)
+
+
+def patron_tokens(patron):
+    """Return the set of (field, token) pairs a patron can be found by"""
+    tokens = set()
+
+    for field in ('last_name', 'first_name', 'address'):
+        for token in normalize_tokens(getattr(patron, field)):
+            tokens.add((field, token))
+
+    # Phone numbers are matched on the full number, the local 7 digits and the last 4
+    phone = digits_only(patron.phone)
+    if phone:
+        for token in {phone, phone[-7:], phone[-4:]}:
+            tokens.add(('phone', token))
+
+    zipcode = digits_only(patron.zipcode)
+    if zipcode:
+        tokens.add(('zipcode', zipcode))
+
+    return tokens
+
+
+def token_trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def index_patrons(patrons):
+    """(Re)build search tokens and trigrams for the given patrons"""
+    patrons = list(patrons)
+    patron_ids = [patron.pk for patron in patrons]
+
+    token_rows = []
+    gram_rows = []
+    for patron in patrons:
+        tokens = patron_tokens(patron)
+        token_rows.extend(
+            PatronSearchToken(foodbank_id=patron.foodbank_id, patron=patron, field=field, token=token)
+            for field, token in tokens
+        )
+        if trigrams_enabled():
+            grams = set()
+            for field, token in tokens:
+                if field in TRIGRAM_FIELDS:
+                    grams |= token_trigrams(token)
+            gram_rows.extend(
+                PatronSearchGram(foodbank_id=patron.foodbank_id, patron=patron, gram=gram)
+                for gram in grams
+            )
+
+    with transaction.atomic():
+        PatronSearchToken.objects.filter(patron_id__in=patron_ids).delete()
+        PatronSearchGram.objects.filter(patron_id__in=patron_ids).delete()
+        PatronSearchToken.objects.bulk_create(token_rows, batch_size=1000)
+        PatronSearchGram.objects.bulk_create(gram_rows, batch_size=1000)
+
+    return len(token_rows), len(gram_rows)
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest token that sorts after every token starting with `prefix`, or None.
+
+    Prefix searches are run as `token >= prefix AND token < bound` so both
+    SQLite and MySQL can answer them from the (foodbank, token) index, which a
+    LIKE 'prefix%' can't always do.
+    """
+    while prefix:
+        position = TOKEN_ALPHABET.find(prefix[-1])
+        if 0 <= position < len(TOKEN_ALPHABET) - 1:
+            return prefix[:-1] + TOKEN_ALPHABET[position + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def query_terms(query):
+    """Split a search query into normalized terms; phone-like input stays one term"""
+    query = str(query or '').strip()
+    if re.fullmatch(r'[\d\s().+-]+', query):
+        digits = digits_only(query)
+        return [digits] if digits else []
+    return normalize_tokens(query)
+
+
+def term_lookups(term):
+    """Queryset lookups matching tokens equal to, or starting with, `term`"""
+    lookups = {'token__gte': term}
+    upper = prefix_upper_bound(term)
+    if upper is not None:
+        lookups['token__lt'] = upper
+    return lookups
+
+
+def match_tiers(term):
+    """
+    Ranking tiers for a search term, best first, as (field, lookups) pairs.
+
+    An exact name match beats a name prefix, names beat phone and zip, and
+    the address comes last. Digit-only terms only look at phone, zip and
+    address; terms with letters skip phone and zip.
+    """
+    if term.isdigit():
+        ranked_fields = ('phone', 'zipcode')
+    else:
+        ranked_fields = ('last_name', 'first_name')
+
+    tiers = [(field, {'token': term}) for field in ranked_fields]
+    tiers += [(field, term_lookups(term)) for field in ranked_fields]
+    tiers.append(('address', term_lookups(term)))
+    return tiers
+
+
+def infix_matches(patron, term):
+    """True if `term` appears inside one of the patron's name or address words"""
+    return any(
+        term in token
+        for field in TRIGRAM_FIELDS
+        for token in normalize_tokens(patron[field])
+    )
+
+
+def search_patrons(foodbank, query, limit=10):
+    """
+    Ranked typeahead search over a foodbank's patrons.
+
+    The first term decides the ranking (see match_tiers); every other term just
+    has to prefix-match one of the patron's tokens. Each tier walks the
+    (foodbank, field, token, patron) index in order, a page at a time, until
+    it runs out or `limit` patrons have been found, so ties within a tier go
+    to the oldest patron. With trigrams enabled, a last tier finds names and
+    addresses that contain the first term anywhere.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    first_term, other_terms = terms[0], terms[1:]
+
+    def require_other_terms(queryset, patron_ref):
+        for term in other_terms:
+            queryset = queryset.filter(Exists(
+                PatronSearchToken.objects.filter(patron=OuterRef(patron_ref), **term_lookups(term))
+            ))
+        return queryset
+
+    found = []
+    for field, lookups in match_tiers(first_term):
+        tokens = PatronSearchToken.objects.filter(foodbank=foodbank, field=field, **lookups)
+        tokens = require_other_terms(tokens, 'patron').exclude(patron_id__in=found)
+        tokens = tokens.order_by('token', 'patron_id').values_list('token', 'patron_id')
+
+        # A patron can have several matching tokens, so keep paging through the
+        # tier (seeking past the last row) until it's exhausted or the limit is hit
+        page = tokens
+        while True:
+            page_size = (limit - len(found)) * 2
+            rows = list(page[:page_size])
+            for token, patron_id in rows:
+                if patron_id not in found:
+                    found.append(patron_id)
+                    if len(found) >= limit:
+                        break
+            if len(found) >= limit or len(rows) < page_size:
+                break
+            last_token, last_patron_id = rows[-1]
+            page = tokens.filter(Q(token__gt=last_token) | Q(token=last_token, patron_id__gt=last_patron_id))
+        if len(found) >= limit:
+            break
+
+    fields = ('id', 'first_name', 'last_name', 'address', 'city', 'state', 'zipcode', 'phone')
+    rows = {row['id']: row for row in Patron.objects.filter(pk__in=found).values(*fields)}
+    results = [rows[patron_id] for patron_id in found if patron_id in rows]
+
+    if len(results) < limit and trigrams_enabled() and len(first_term) >= 3 and not first_term.isdigit():
+        first_gram, *other_grams = sorted(token_trigrams(first_term))
+        candidates = PatronSearchGram.objects.filter(foodbank=foodbank, gram=first_gram)
+        for gram in other_grams:
+            candidates = candidates.filter(Exists(
+                PatronSearchGram.objects.filter(patron=OuterRef('patron'), gram=gram)
+            ))
+        candidates = require_other_terms(candidates, 'patron').exclude(patron_id__in=found)
+        candidate_ids = candidates.order_by('patron_id').values_list('patron_id', flat=True)
+
+        # Grams can come from different words, so over-fetch and confirm the real
+        # match, paging on until enough are confirmed or the candidates run out
+        page = candidate_ids
+        while True:
+            page_size = (limit - len(results)) * 3
+            page_ids = list(page[:page_size])
+            patrons = Patron.objects.filter(pk__in=page_ids)
+            for row in patrons.order_by('last_name', 'first_name').values(*fields):
+                if infix_matches(row, first_term):
+                    results.append(row)
+                    if len(results) >= limit:
+                        break
+            if len(results) >= limit or len(page_ids) < page_size:
+                break
+            page = candidate_ids.filter(patron_id__gt=page_ids[-1])
+
+    return results
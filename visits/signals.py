@@ -0,0 +1,97 @@
+# visits/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .counters import counter_key, refresh_last_visits, sync_patron_months
+from .models import Patron, Visit
+from .rollups import refresh_rollups, rollup_key
+from .search import index_patrons
+from .stats import invalidate_dashboard_statistics
+
+
+@receiver(post_save, sender=Visit)
+@receiver(post_delete, sender=Visit)
+def refresh_patron_last_visit(sender, instance, raw=False, **kwargs):
+    """
+    Refresh the last-visit snapshot of the visit's patron (and of the patron
+    it was moved away from, on edits); this also bumps their updated_date so
+    roster deltas pick up visit changes
+    """
+    if raw:
+        return
+    # Runs before sync_visit_counters, which resets the loaded key
+    loaded_key = getattr(instance, '_loaded_counter_key', None)
+    patron_ids = {instance.patron_id, loaded_key and loaded_key[0]} - {None}
+    refresh_last_visits(patron_ids)
+
+
+@receiver(post_save, sender=Patron)
+def index_patron_search(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the patron's typeahead tokens in step with their name, address and phone"""
+    if raw:
+        return
+    if update_fields is not None and not {'first_name', 'last_name', 'address', 'phone', 'zipcode'} & set(update_fields):
+        return
+    index_patrons([instance])
+
+
+# Must stay ahead of refresh_visit_rollups, which counts the first-visit flags set here
+@receiver(post_save, sender=Visit)
+@receiver(post_delete, sender=Visit)
+def sync_visit_counters(sender, instance, raw=False, **kwargs):
+    """
+    Recount the patron's month the visit is in (and the one it moved out of,
+    on edits), which also decides whether it's their first visit this month
+    """
+    if raw:
+        return
+    keys = {counter_key(instance), getattr(instance, '_loaded_counter_key', None)} - {None}
+    flipped = sync_patron_months(keys)
+    instance._loaded_counter_key = counter_key(instance)
+
+    if instance.pk in flipped:
+        instance.first_visit_this_month = not instance.first_visit_this_month
+    # Rollups of other days whose first visit changed; the visit's own is refreshed next
+    refresh_rollups(set(flipped.values()) - {rollup_key(instance)})
+
+
+@receiver(post_save, sender=Visit)
+@receiver(post_delete, sender=Visit)
+def refresh_visit_rollups(sender, instance, raw=False, **kwargs):
+    """
+    Recompute the daily rollup the visit is in (and the one it moved out of,
+    on edits), then drop the dashboard statistics cached from them.
+    """
+    if raw:
+        return
+    keys = {rollup_key(instance)}
+    loaded_key = getattr(instance, '_loaded_rollup_key', None)
+    if loaded_key:
+        keys.add(loaded_key)
+    refresh_rollups(keys)
+    instance._loaded_rollup_key = rollup_key(instance)
+
+    invalidate_dashboard_statistics(instance.foodbank, visit_dates={date for _, date, _ in keys})
+
+
+@receiver(pre_delete, sender=Patron)
+def collect_patron_rollups(sender, instance, **kwargs):
+    """Note the days a patron visited; deleting them turns those visits anonymous"""
+    instance._rollup_keys = set(
+        Visit.objects.filter(patron=instance).order_by()
+        .values_list('foodbank_id', 'visit_date', 'is_food_truck').distinct()
+    )
+
+
+@receiver(post_delete, sender=Patron)
+def refresh_patron_rollups(sender, instance, **kwargs):
+    refresh_rollups(getattr(instance, '_rollup_keys', ()))
+
+
+@receiver(post_save, sender=Patron)
+@receiver(post_delete, sender=Patron)
+def invalidate_patron_count(sender, instance, raw=False, created=True, **kwargs):
+    """Adding or deleting a patron changes the dashboard's patron total; edits don't"""
+    if raw or not created:
+        return
+    invalidate_dashboard_statistics(instance.foodbank)
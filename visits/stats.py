@@ -0,0 +1,225 @@
+# visits/stats.py
+from collections import Counter, defaultdict
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from foodbanked.utils import get_foodbank_today
+from .models import DailyVisitRollup, Patron, Visit
+
+# Number of days shown on the "visits over time" chart
+SERIES_DAYS = 30
+
+
+def foodbank_statistics(foodbank, today=None):
+    """
+    Month-to-date statistics and charts for a foodbank's analytics page.
+
+    Runs three queries regardless of how many visits there are:
+    - one aggregate over the daily rollups for every month-to-date total,
+    - one count of distinct patrons this month (households can't be added
+      up across days, so this one reads visits),
+    - one fetch of the rollup rows behind the 30-day chart and the zipcode
+      and household size breakdowns.
+    """
+    if today is None:
+        today = get_foodbank_today(foodbank)
+    month_start = today.replace(day=1)
+    series_start = today - timedelta(days=SERIES_DAYS - 1)
+    window_start = min(month_start, series_start)
+
+    rollups = DailyVisitRollup.objects.filter(foodbank=foodbank, date__gte=window_start)
+    this_month = Q(date__gte=month_start)
+
+    totals = rollups.aggregate(**{
+        field: Coalesce(Sum(field, filter=this_month), 0)
+        for field in (
+            'visit_count', 'people_served', 'first_time_visitors', 'anonymous_visits',
+            'age_0_18', 'age_19_59', 'age_60_plus',
+        )
+    })
+
+    identified_households = Visit.objects.filter(
+        foodbank=foodbank,
+        visit_date__gte=month_start,
+        patron__isnull=False
+    ).values('patron').distinct().count()
+
+    # Chart days start at zero so days without visits still show up
+    visits_by_date = {today - timedelta(days=days_ago): 0 for days_ago in range(SERIES_DAYS)}
+    zipcode_counts = Counter()
+    household_size_counts = Counter()
+
+    rows = rollups.values('date', 'visit_count', 'zipcode_counts', 'household_size_counts')
+    for row in rows:
+        if series_start <= row['date'] <= today:
+            visits_by_date[row['date']] += row['visit_count']
+        if row['date'] >= month_start:
+            zipcode_counts.update(row['zipcode_counts'])
+            household_size_counts.update(row['household_size_counts'])
+
+    dates = sorted(visits_by_date)
+
+    return {
+        'visits_this_month': totals['visit_count'],
+        'unique_households': identified_households + totals['anonymous_visits'],
+        'people_served': totals['people_served'],
+        'first_time_visitors': totals['first_time_visitors'],
+        'visits_over_time': {
+            'labels': [date.strftime('%b %d') for date in dates],
+            'values': [visits_by_date[date] for date in dates],
+        },
+        'age_distribution': {
+            'labels': ['0-18 years', '19-59 years', '60+ years'],
+            'values': [totals['age_0_18'], totals['age_19_59'], totals['age_60_plus']],
+        },
+        'zip_codes': zipcode_counts.most_common(5),
+        'household_sizes': sorted((int(size), count) for size, count in household_size_counts.items()),
+    }
+
+
+def with_percentages(counts, key):
+    """Turn (value, count) pairs into bar rows scaled against the largest count"""
+    max_count = max([count for value, count in counts], default=1)
+    return [
+        {
+            key: value,
+            'count': count,
+            'percentage': (count / max_count * 100) if max_count > 0 else 0
+        }
+        for value, count in counts
+    ]
+
+
+def dashboard_statistics(foodbank, today=None):
+    """Visit counts for today, this week and this month, plus total patrons"""
+    if today is None:
+        today = get_foodbank_today(foodbank)
+    week_start = today - timedelta(days=today.weekday())  # Monday of this week
+    month_start = today.replace(day=1)
+
+    visit_totals = DailyVisitRollup.objects.filter(
+        foodbank=foodbank,
+        date__gte=min(week_start, month_start)
+    ).aggregate(
+        visits_today=Coalesce(Sum('visit_count', filter=Q(date=today)), 0),
+        visits_this_week=Coalesce(Sum('visit_count', filter=Q(date__gte=week_start)), 0),
+        visits_this_month=Coalesce(Sum('visit_count', filter=Q(date__gte=month_start)), 0),
+    )
+
+    return {
+        **visit_totals,
+        'total_patrons': Patron.objects.filter(foodbank=foodbank).count(),
+    }
+
+
+def dashboard_cache_key(foodbank_id, today):
+    return f'dashboard-stats:{foodbank_id}:{today.isoformat()}'
+
+
+def cached_dashboard_statistics(foodbank):
+    """dashboard_statistics() through the cache, keyed by foodbank and local date"""
+    today = get_foodbank_today(foodbank)
+    key = dashboard_cache_key(foodbank.id, today)
+
+    stats = cache.get(key)
+    if stats is None:
+        count_cache_lookup('misses')
+        stats = dashboard_statistics(foodbank, today=today)
+        cache.set(key, stats, settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+    else:
+        count_cache_lookup('hits')
+    return stats
+
+
+def invalidate_dashboard_statistics(foodbank, visit_dates=None):
+    """
+    Drop a foodbank's cached dashboard statistics once the current transaction commits.
+
+    Pass the dates of the visits that changed to skip the invalidation when
+    none of them fall in the week or month the dashboard counts.
+    """
+    today = get_foodbank_today(foodbank)
+    if visit_dates is not None:
+        window_start = min(today - timedelta(days=today.weekday()), today.replace(day=1))
+        if all(date < window_start for date in visit_dates):
+            return
+
+    key = dashboard_cache_key(foodbank.id, today)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def count_cache_lookup(outcome):
+    key = f'dashboard-stats:{outcome}'
+    # Counters live in the cache too, so every worker adds to the same totals
+    # on shared backends; they never expire but reset when the cache is cleared
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def dashboard_cache_counters():
+    """Hit and miss totals for the dashboard statistics cache"""
+    hits = cache.get('dashboard-stats:hits', 0)
+    misses = cache.get('dashboard-stats:misses', 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 3) if lookups else None,
+    }
+
+
+def organization_visit_counts(foodbanks, all_time=False):
+    """
+    Visit counts for a set of foodbanks (an organization's members), each
+    counted against its own local today, week and month.
+
+    Foodbanks are grouped by timezone and each timezone gets one grouped query,
+    so the cost grows with the number of distinct timezones, not foodbanks.
+    Returns {foodbank_id: {'visits_today', 'visits_week', 'visits_month'}},
+    plus 'total_visits' when `all_time` is set. Foodbanks without visits are
+    left out.
+    """
+    foodbank_ids_by_timezone = defaultdict(list)
+    for foodbank in foodbanks:
+        foodbank_ids_by_timezone[foodbank.timezone].append(foodbank.id)
+
+    # One instant for every group, so all local dates describe the same moment
+    now = timezone.now()
+
+    counts = {}
+    for tz_name, foodbank_ids in foodbank_ids_by_timezone.items():
+        today = now.astimezone(ZoneInfo(tz_name)).date()
+        counts.update(grouped_visit_counts(foodbank_ids, today, all_time=all_time))
+    return counts
+
+
+def grouped_visit_counts(foodbank_ids, today, all_time=False):
+    """Per-foodbank visit counts for foodbanks sharing the same local `today`"""
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    rollups = DailyVisitRollup.objects.filter(foodbank_id__in=foodbank_ids)
+    counts = {
+        'visits_today': Coalesce(Sum('visit_count', filter=Q(date=today)), 0),
+        'visits_week': Coalesce(Sum('visit_count', filter=Q(date__gte=week_start)), 0),
+        'visits_month': Coalesce(Sum('visit_count', filter=Q(date__gte=month_start)), 0),
+    }
+    if all_time:
+        # Has to read every rollup row rather than just this week's and month's
+        counts['total_visits'] = Coalesce(Sum('visit_count'), 0)
+    else:
+        rollups = rollups.filter(date__gte=min(week_start, month_start))
+
+    rows = rollups.order_by().values('foodbank').annotate(**counts)
+    return {row.pop('foodbank'): row for row in rows}
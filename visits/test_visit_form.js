@@ -0,0 +1,158 @@
+// visits/test_visit_form.js
+// Runs static/js/visit_form.js against a minimal fake page and IndexedDB, and
+// prints what the intake page shows after syncing a queue the server rejects.
+// Run by visits.tests.VisitFormQueueScriptTests: node test_visit_form.js <visit_form.js>
+'use strict';
+
+const fs = require('fs');
+const vm = require('vm');
+
+const QUEUE_KEY = 'visit-queue-1';
+const REJECTED_UUID = '1b4e28ba-2fa1-41d2-883f-0016d3cca427';
+
+class FakeElement {
+    constructor(tagName, id) {
+        this.tagName = tagName;
+        this.id = id;
+        this.children = [];
+        this.listeners = {};
+        this.style = {};
+        this.dataset = {};
+        this.value = '';
+        this.checked = false;
+        this.textContent = '';
+        this.className = '';
+        this.classList = { add() {}, remove() {}, toggle() {}, contains: () => false };
+    }
+
+    set innerHTML(html) {
+        this.children = [];
+        this.textContent = html;
+    }
+
+    get innerHTML() {
+        return this.textContent;
+    }
+
+    get text() {
+        return this.textContent + this.children.map(child => child.text).join('');
+    }
+
+    appendChild(child) {
+        this.children.push(child);
+        return child;
+    }
+
+    addEventListener(type, listener) {
+        (this.listeners[type] = this.listeners[type] || []).push(listener);
+    }
+
+    querySelector() { return null; }
+    querySelectorAll() { return []; }
+    setAttribute() {}
+    removeAttribute() {}
+    focus() {}
+    remove() {}
+}
+
+// Enough of IndexedDB for the visit queue: one store, keyed by client_uuid, with a queueKey index
+function fakeIndexedDB(rows) {
+    function request(work) {
+        const req = {};
+        setTimeout(() => {
+            req.result = work();
+            if (req.onsuccess) req.onsuccess();
+        });
+        return req;
+    }
+    const store = {
+        put: entry => request(() => rows.set(entry.client_uuid, JSON.parse(JSON.stringify(entry)))),
+        delete: key => request(() => rows.delete(key)),
+        index: () => ({
+            getAll: key => request(() => [...rows.values()].filter(row => row.queueKey === key).map(row => JSON.parse(JSON.stringify(row))))
+        })
+    };
+    const db = {
+        transaction() {
+            const tx = { objectStore: () => store };
+            setTimeout(() => setTimeout(() => tx.oncomplete && tx.oncomplete()));
+            return tx;
+        }
+    };
+    return { open: () => request(() => db) };
+}
+
+const rows = new Map([[REJECTED_UUID, {
+    client_uuid: REJECTED_UUID,
+    queueKey: QUEUE_KEY,
+    queuedAt: 1,
+    visit: { client_uuid: REJECTED_UUID, visit_date: '2026-01-02', zipcode: '83843', household_size: '2', is_food_truck: false }
+}]]);
+
+const elements = {};
+const documentListeners = {};
+const document = {
+    getElementById(id) {
+        if (!elements[id]) elements[id] = new FakeElement('div', id);
+        return elements[id];
+    },
+    createElement: tagName => new FakeElement(tagName),
+    querySelector: selector => (selector === '[name=csrfmiddlewaretoken]' ? { value: 'token' } : null),
+    querySelectorAll: () => [],
+    addEventListener(type, listener) {
+        (documentListeners[type] = documentListeners[type] || []).push(listener);
+    },
+    body: new FakeElement('body')
+};
+
+const visitForm = document.getElementById('visitForm');
+visitForm.dataset = { syncUrl: '/visits/api/visits/sync/', queueKey: QUEUE_KEY, timezone: 'UTC' };
+
+const posted = [];
+function fetch(url, options) {
+    posted.push({ url: url, body: JSON.parse(options.body) });
+    return Promise.resolve({
+        ok: true,
+        redirected: false,
+        json: () => Promise.resolve({
+            success: true,
+            synced: [],
+            rejected: [{ client_uuid: REJECTED_UUID, errors: { household_size: ['Ensure this value is greater than or equal to 1.'] } }]
+        })
+    });
+}
+
+const window = {
+    location: { search: '' },
+    addEventListener() {},
+    indexedDB: fakeIndexedDB(rows)
+};
+const context = vm.createContext({
+    window: window,
+    document: document,
+    indexedDB: window.indexedDB,
+    fetch: fetch,
+    localStorage: { getItem: () => null, setItem() {}, removeItem() {} },
+    navigator: { onLine: true },
+    console: { log() {}, error: (...args) => process.stderr.write(args.join(' ') + '\n') },
+    setTimeout: setTimeout,
+    setInterval: () => 0,
+    clearTimeout: clearTimeout,
+    URLSearchParams: URLSearchParams,
+    Intl: Intl,
+    crypto: require('crypto').webcrypto
+});
+
+vm.runInContext(fs.readFileSync(process.argv[2], 'utf8'), context, { filename: 'visit_form.js' });
+(documentListeners.DOMContentLoaded || []).forEach(listener => listener());
+
+setTimeout(() => {
+    const rejectedVisits = elements.rejectedVisits;
+    process.stdout.write(JSON.stringify({
+        posted: posted.map(post => post.body.visits.map(visit => visit.client_uuid)),
+        syncStatus: elements.syncStatus.textContent,
+        rejectedDisplay: rejectedVisits.style.display,
+        rejectedText: rejectedVisits.text,
+        queued: [...rows.values()].map(row => ({ client_uuid: row.client_uuid, rejected: row.rejected || null }))
+    }));
+}, 200);
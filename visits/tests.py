@@ -1,3 +1,271 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import subprocess
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Foodbank, FoodbankOrganization
+from foodbanked.utils import get_foodbank_today
+from .ingest import sync_visits
+from .models import DailyVisitRollup, Patron, PatronMonthlyVisits, Visit
+from .roster import build_patron_roster, sync_patron_roster
+from .rollups import rebuild_rollups
+from .search import search_patrons
+from .stats import foodbank_statistics, organization_visit_counts
+
+
+def make_foodbank(name, **fields):
+    user = User.objects.create_user(name, password='password')
+    return Foodbank.objects.create(user=user, name=name, **fields)
+
+
+def make_patrons(foodbank, count, visits_each=2, start=date(2026, 1, 1)):
+    """`count` patrons at the foodbank, each with `visits_each` visits on consecutive days from `start`"""
+    patrons = Patron.objects.bulk_create([
+        Patron(foodbank=foodbank, name=f'Patron {i}', first_name='Patron', last_name=str(i), zipcode='83843')
+        for i in range(count)
+    ])
+    Visit.objects.bulk_create([
+        Visit(
+            foodbank=foodbank, patron=patron, visit_date=start + timedelta(days=day),
+            zipcode='83843', household_size=2, age_19_59=2,
+        )
+        for patron in patrons for day in range(visits_each)
+    ])
+    return patrons
+
+
+class PatronRosterQueryTests(TestCase):
+    def test_roster_is_one_query_at_any_size(self):
+        for count in (10, 100, 500):
+            with self.subTest(patrons=count):
+                foodbank = make_foodbank(f'roster-{count}')
+                make_patrons(foodbank, count)
+                with self.assertNumQueries(1):
+                    roster = build_patron_roster(foodbank, today=date(2026, 1, 15))
+                self.assertEqual(len(roster), count)
+
+
+class PatronRosterSyncTests(TestCase):
+    def test_delta_lists_current_ids_after_a_delete_and_an_add(self):
+        foodbank = make_foodbank('roster-sync')
+        kept, deleted = make_patrons(foodbank, 2, visits_each=0)
+        watermark = timezone.now()
+
+        deleted.delete()
+        added = Patron.objects.create(foodbank=foodbank, name='New', first_name='New', last_name='Patron', zipcode='83843')
+
+        delta = sync_patron_roster(foodbank, since=watermark)
+        self.assertFalse(delta['full'])
+        self.assertEqual(sorted(delta['ids']), sorted([kept.id, added.id]))
+        self.assertEqual(delta['total'], 2)
+        self.assertIn(added.id, [patron['id'] for patron in delta['patrons']])
+
+
+class PatronSearchTests(TestCase):
+    @override_settings(PATRON_SEARCH_TRIGRAMS=False)
+    def test_tier_pages_past_a_patron_with_many_matching_tokens(self):
+        foodbank = make_foodbank('search')
+        many = Patron.objects.create(foodbank=foodbank, name='Many', first_name='Ann', last_name='Smith Smithe Smithson Smithy', zipcode='83843')
+        other = Patron.objects.create(foodbank=foodbank, name='Other', first_name='Bo', last_name='Smiz', zipcode='83843')
+
+        results = search_patrons(foodbank, 'smi', limit=2)
+        self.assertEqual([row['id'] for row in results], [many.id, other.id])
+
+
+class VisitExportTests(TestCase):
+    def export_dates(self, response):
+        rows = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig')))
+        return sorted(row['Date'] for row in rows)
+
+    def test_export_honours_the_list_time_filter(self):
+        foodbank = make_foodbank('export')
+        today = get_foodbank_today(foodbank)
+        make_patrons(foodbank, 1, visits_each=1, start=today)
+        make_patrons(foodbank, 1, visits_each=1, start=today - timedelta(days=400))
+        self.client.force_login(foodbank.user)
+
+        list_page = self.client.get(reverse('visits:visit_list'), {'filter': 'month'})
+        self.assertContains(list_page, f"{reverse('visits:visit_export')}?filter=month")
+
+        response = self.client.get(reverse('visits:visit_export'), {'filter': 'month'})
+        self.assertEqual(self.export_dates(response), [today.isoformat()])
+        response = self.client.get(reverse('visits:visit_export'))
+        self.assertEqual(len(self.export_dates(response)), 2)
+
+
+class VisitSyncTests(TestCase):
+    def test_visit_of_a_deleted_patron_syncs_as_anonymous(self):
+        foodbank = make_foodbank('sync')
+        [patron] = make_patrons(foodbank, 1, visits_each=0)
+        patron_id = patron.id
+        patron.delete()
+
+        row = {
+            'client_uuid': '1b4e28ba-2fa1-41d2-883f-0016d3cca427', 'visit_date': '2026-01-02',
+            'patron_id': str(patron_id), 'zipcode': '83843', 'household_size': '1', 'age_0_18': '0', 'age_19_59': '1', 'age_60_plus': '0',
+        }
+        synced, rejected = sync_visits(foodbank, [row])
+        self.assertEqual(synced, [row['client_uuid']])
+        self.assertEqual(rejected, [])
+        self.assertIsNone(Visit.objects.get(client_uuid=row['client_uuid']).patron)
+
+
+@skipUnless(shutil.which('node'), 'needs Node.js')
+class VisitFormQueueScriptTests(SimpleTestCase):
+    """static/js/visit_form.js run under Node against a fake page and IndexedDB (see test_visit_form.js)"""
+
+    def run_script(self):
+        harness = Path(__file__).with_name('test_visit_form.js')
+        script = Path(settings.BASE_DIR) / 'static' / 'js' / 'visit_form.js'
+        completed = subprocess.run(
+            ['node', str(harness), str(script)], capture_output=True, text=True, timeout=30, check=True,
+        )
+        return json.loads(completed.stdout)
+
+    def test_rejected_sync_is_listed_and_kept(self):
+        page = self.run_script()
+        self.assertEqual(page['posted'], [['1b4e28ba-2fa1-41d2-883f-0016d3cca427']])
+        self.assertEqual(page['rejectedDisplay'], 'block')
+        self.assertIn('1 queued visit was not recorded', page['rejectedText'])
+        self.assertIn('greater than or equal to 1', page['rejectedText'])
+        self.assertIn('Dismiss', page['rejectedText'])
+        # Kept, marked rejected, until dismissed
+        self.assertEqual(len(page['queued']), 1)
+        self.assertIsNotNone(page['queued'][0]['rejected'])
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite's")
+class VisitIndexPlanTests(TestCase):
+    """The hot Visit queries of the analytics, dashboard, intake and roster pages range-scan a composite index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.foodbank = make_foodbank('plans')
+        cls.patrons = make_patrons(cls.foodbank, 50, visits_each=4)
+        make_patrons(make_foodbank('plans-other'), 50, visits_each=4)
+
+    def index_name(self, *fields):
+        return next(index.name for index in Visit._meta.indexes if tuple(index.fields) == fields)
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, *fields_options):
+        plan = self.query_plan(queryset)
+        names = [self.index_name(*fields) for fields in fields_options]
+        self.assertTrue(
+            any(f'INDEX {name} ' in step for step in plan for name in names),
+            f"None of {names} in plan {plan}",
+        )
+        self.assertFalse([step for step in plan if step.startswith('SCAN visits_visit')], plan)
+        self.assertFalse([step for step in plan if 'TEMP B-TREE FOR ORDER BY' in step], plan)
+
+    def test_month_households_use_foodbank_date_index(self):
+        visits = Visit.objects.filter(
+            foodbank=self.foodbank, visit_date__gte=date(2026, 1, 1), patron__isnull=False
+        ).values('patron').distinct()
+        self.assertUsesIndex(visits, ('foodbank', 'visit_date'))
+
+    def test_dashboard_recent_visits_read_the_index_in_order(self):
+        visits = Visit.objects.filter(foodbank=self.foodbank).order_by('-visit_date')[:5]
+        self.assertUsesIndex(visits, ('foodbank', 'visit_date'))
+
+    def test_intake_todays_visits_use_a_foodbank_index(self):
+        visits = Visit.objects.filter(foodbank=self.foodbank, visit_date=date(2026, 1, 2), is_food_truck=False)
+        self.assertUsesIndex(visits, ('foodbank', 'visit_date'), ('foodbank', 'is_food_truck', 'visit_date'))
+
+    def test_visit_type_range_uses_visit_type_index(self):
+        visits = Visit.objects.filter(foodbank=self.foodbank, is_food_truck=True, visit_date__gte=date(2026, 1, 1))
+        self.assertUsesIndex(visits, ('foodbank', 'is_food_truck', 'visit_date'), ('foodbank', 'visit_date'))
+
+    def test_patron_history_uses_patron_index(self):
+        visits = Visit.objects.filter(patron=self.patrons[0]).order_by('-visit_date')
+        self.assertUsesIndex(visits, ('patron', 'visit_date', 'id'))
+
+
+class FoodbankStatisticsTests(TestCase):
+    def test_statistics_are_three_queries(self):
+        foodbank = make_foodbank('statistics')
+        make_patrons(foodbank, 30, visits_each=10, start=date(2026, 1, 1))
+        rebuild_rollups(foodbank_id=foodbank.id)
+
+        with self.assertNumQueries(3):
+            stats = foodbank_statistics(foodbank, today=date(2026, 1, 20))
+        self.assertEqual(stats['visits_this_month'], 300)
+        self.assertEqual(stats['unique_households'], 30)
+        self.assertEqual(stats['people_served'], 600)
+
+
+class OrganizationVisitCountTests(TestCase):
+    def make_members(self, organization, count, timezones):
+        users = User.objects.bulk_create([User(username=f'{organization.slug}-{i}') for i in range(count)])
+        foodbanks = Foodbank.objects.bulk_create([
+            Foodbank(user=user, organization=organization, name=user.username, timezone=timezones[i % len(timezones)])
+            for i, user in enumerate(users)
+        ])
+        today = timezone.localdate()
+        DailyVisitRollup.objects.bulk_create([
+            DailyVisitRollup(foodbank=foodbank, date=today - timedelta(days=days_ago), visit_count=2)
+            for foodbank in foodbanks for days_ago in range(3)
+        ])
+        return foodbanks
+
+    def test_one_query_per_timezone_at_any_size(self):
+        timezones = ['America/Los_Angeles', 'America/Denver']
+        for count in (10, 100, 500):
+            with self.subTest(foodbanks=count):
+                organization = FoodbankOrganization.objects.create(name=f'Organization {count}')
+                foodbanks = self.make_members(organization, count, timezones)
+                with self.assertNumQueries(len(timezones)):
+                    counts = organization_visit_counts(foodbanks)
+                self.assertEqual(len(counts), count)
+
+
+class VisitCounterTransactionTests(TransactionTestCase):
+    """Without a test-wide transaction, so a visit's own transaction is the outermost one"""
+
+    def setUp(self):
+        self.foodbank = make_foodbank('counters')
+        self.patron = Patron.objects.create(foodbank=self.foodbank, name='P', first_name='P', last_name='Q', zipcode='83843')
+
+    def make_visit(self, visit_date):
+        return Visit.objects.create(
+            foodbank=self.foodbank, patron=self.patron, visit_date=visit_date,
+            zipcode='83843', household_size=1, age_19_59=1,
+        )
+
+    def test_counters_follow_create_and_delete(self):
+        first = self.make_visit(date(2026, 3, 2))
+        second = self.make_visit(date(2026, 3, 9))
+        counter = PatronMonthlyVisits.objects.get(patron=self.patron, month=date(2026, 3, 1))
+        self.assertEqual(counter.visit_count, 2)
+        self.assertEqual(
+            dict(Visit.objects.values_list('pk', 'first_visit_this_month')),
+            {first.pk: True, second.pk: False},
+        )
+
+        first.delete()
+        counter.refresh_from_db()
+        self.assertEqual(counter.visit_count, 1)
+        self.assertTrue(Visit.objects.get(pk=second.pk).first_visit_this_month)
+
+    def test_failed_counter_update_rolls_back_the_visit(self):
+        with mock.patch('visits.signals.sync_patron_months', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                self.make_visit(date(2026, 3, 2))
+        self.assertFalse(Visit.objects.exists())
+        self.assertFalse(PatronMonthlyVisits.objects.exists())
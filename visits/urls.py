@@ -6,6 +6,10 @@ app_name = 'visits'
 urlpatterns = [
     # Visits
     path('visits/', views.visit_list, name='visit_list'),
+    path('api/visits/', views.visit_page_api, name='visit_page_api'),
+    path('api/visits/bulk/', views.visit_bulk_api, name='visit_bulk_api'),
+    path('api/visits/sync/', views.visit_sync_api, name='visit_sync_api'),
+    path('visits/export/', views.visit_export, name='visit_export'),
     path('visits/new/', views.visit_create, name='visit_create'),
     path('visits/<int:pk>/', views.visit_detail, name='visit_detail'),
     path('visits/<int:pk>/delete/', views.visit_delete, name='visit_delete'),
@@ -20,6 +24,8 @@ urlpatterns = [
     path('patron/<int:pk>/edit-ajax/', views.patron_edit_ajax, name='patron_edit_ajax'),
 
     path('api/patron/<int:patron_id>/', views.patron_detail_api, name='patron_detail_api'),
+    path('api/roster/', views.patron_roster_api, name='patron_roster_api'),
+    path('api/patrons/search/', views.patron_search_api, name='patron_search_api'),
     
     # Stats
     path('analytics/', views.analytics_view, name='analytics'),
@@ -2,70 +2,217 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from .models import Visit, Patron
+from django.views.decorators.http import require_POST
+from .models import DailyVisitRollup, Visit, Patron
+from .export import export_download
 from .forms import VisitForm
+from .ingest import VisitBatchError, ingest_visits, parse_visit_batch, sync_visits
+from .pagination import visit_page
+from .roster import sync_patron_roster
+from .search import search_patrons
+from .stats import foodbank_statistics, with_percentages
 from foodbanked.utils import get_foodbank_today
 from accounts.models import ServiceZipcode
 from .forms import PatronForm
 from django.urls import reverse
+from urllib.parse import urlencode
 from django.utils import timezone
-from django.db.models import Count
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, Q, Sum
 import json
+from datetime import timedelta
 from accounts.decorators import foodbank_required, organization_required
 
-@login_required
-@foodbank_required
-def visit_list(request):
-    """List all visits for this foodbank with filtering"""
-    foodbank = request.user.foodbank
-    
+# Wording of the visit list's time filters (?filter=) in "Showing N visits ..."
+TIME_FILTER_LABELS = {
+    'today': 'today',
+    'week': 'this week',
+    'month': 'this month',
+    'ytd': 'year to date',
+}
+
+
+def time_filter_range(filter_type, today):
+    """(start, end) dates a time filter covers; (None, None) for all visits"""
+    if filter_type == 'today':
+        return today, today
+    if filter_type == 'week':
+        return today - timedelta(days=today.weekday()), None  # Monday
+    if filter_type == 'month':
+        return today.replace(day=1), None
+    if filter_type == 'ytd':
+        return today.replace(month=1, day=1), None
+    return None, None
+
+
+def filter_visit_list(request, foodbank):
+    """
+    Apply the visit list's time and visit type filters.
+    Returns the filtered visits, the matching daily rollups (for counting) and
+    the filter values for the template.
+    """
     # Get filter parameters
     filter_type = request.GET.get('filter', None)
     visit_type_filter = request.GET.get('visit_type', None)
     
-    # Base queryset
+    # Base querysets
     visits = Visit.objects.filter(foodbank=foodbank).select_related('patron')
+    rollups = DailyVisitRollup.objects.filter(foodbank=foodbank)
     
     # Apply visit type filter first
     if visit_type_filter == 'pantry':
         visits = visits.filter(is_food_truck=False)
+        rollups = rollups.filter(is_food_truck=False)
     elif visit_type_filter == 'food_truck':
         visits = visits.filter(is_food_truck=True)
+        rollups = rollups.filter(is_food_truck=True)
     
     # Apply time-based filters
-    from datetime import timedelta
+    start, end = time_filter_range(filter_type, get_foodbank_today(foodbank))
+    if start:
+        visits = visits.filter(visit_date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        visits = visits.filter(visit_date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+    filter_label = TIME_FILTER_LABELS.get(filter_type)
+    
+    filters = {
+        'filter': filter_type,
+        'filter_label': filter_label,
+        'visit_type_filter': visit_type_filter,
+    }
+    return visits, rollups, filters
+
+
+def visit_page_url(request, cursor):
+    """URL of the visit page API continuing after `cursor`, keeping the list filters"""
+    if cursor is None:
+        return None
+    params = {key: request.GET[key] for key in ('filter', 'visit_type') if request.GET.get(key)}
+    params['after'] = cursor
+    return f"{reverse('visits:visit_page_api')}?{urlencode(params)}"
+
+
+def serialize_visit_row(visit):
+    """Visit fields shown in one row of the visit list"""
+    return {
+        'id': visit.id,
+        'url': f"{reverse('visits:visit_detail', args=[visit.pk])}?from=list",
+        'patron_name': visit.patron.name if visit.patron else None,
+        'visit_date': visit.visit_date.isoformat(),
+        'visit_date_display': visit.visit_date.strftime('%b %d, %Y'),
+        'is_food_truck': visit.is_food_truck,
+        'household_size': visit.household_size,
+        'zipcode': visit.zipcode,
+    }
+
+
+@login_required
+@foodbank_required
+def visit_list(request):
+    """List visits for this foodbank with filtering, one page at a time"""
+    foodbank = request.user.foodbank
     
-    today = get_foodbank_today(foodbank)
-    filter_label = None
+    visits, rollups, filters = filter_visit_list(request, foodbank)
     
-    if filter_type == 'today':
-        visits = visits.filter(visit_date=today)
-        filter_label = "today"
-    elif filter_type == 'week':
-        week_start = today - timedelta(days=today.weekday())  # Monday
-        visits = visits.filter(visit_date__gte=week_start)
-        filter_label = "this week"
-    elif filter_type == 'month':
-        month_start = today.replace(day=1)
-        visits = visits.filter(visit_date__gte=month_start)
-        filter_label = "this month"
-    elif filter_type == 'ytd':
-        year_start = today.replace(month=1, day=1)
-        visits = visits.filter(visit_date__gte=year_start)
-        filter_label = "year to date"
-        
-    # Order by most recent first
-    visits = visits.order_by('-visit_date', '-id')
+    # Count once from the daily rollups; only the first page is rendered,
+    # the rest is loaded by infinite scroll from visit_page_api
+    total_visits = rollups.aggregate(total=Sum('visit_count'))['total'] or 0
+    page, next_cursor = visit_page(visits)
     
     context = {
-        'visits': visits,
-        'filter': filter_type,
-        'filter_label': filter_label,
-        'visit_type_filter': visit_type_filter,
+        'visits': page,
+        'total_visits': total_visits,
+        'next_page_url': visit_page_url(request, next_cursor),
+        **filters,
     }
     return render(request, 'visits/visit_list.html', context)
 
 
+@login_required
+@foodbank_required
+def visit_page_api(request):
+    """
+    Next page of the visit list for infinite scroll.
+    Takes the same filters as the list page plus the `after` cursor.
+    """
+    visits, rollups, filters = filter_visit_list(request, request.user.foodbank)
+    
+    try:
+        page, next_cursor = visit_page(visits, after=request.GET.get('after'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid page cursor'}, status=400)
+    
+    return JsonResponse({
+        'visits': [serialize_visit_row(visit) for visit in page],
+        'next': visit_page_url(request, next_cursor),
+    })
+
+
+@login_required
+@foodbank_required
+def visit_export(request):
+    """
+    Download the foodbank's visits as CSV or XLSX (?start=, ?end=, ?visit_type=,
+    ?format=). The visit list's ?filter= sets the dates not given, so its
+    export link covers the visits on screen.
+    """
+    foodbank = request.user.foodbank
+    start, end = time_filter_range(request.GET.get('filter'), get_foodbank_today(foodbank))
+    return export_download(request, [foodbank.pk], foodbank.name, start=start, end=end)
+
+
+@login_required
+@foodbank_required
+@require_POST
+def visit_bulk_api(request):
+    """
+    Record a batch of visits with explicit dates, e.g. typed in from paper
+    after an outage. Takes a JSON list of visits, or CSV as the request body
+    (Content-Type: text/csv) or as an uploaded `file`. All or nothing: any
+    invalid row rejects the batch, with the errors listed per row.
+    """
+    foodbank = request.user.foodbank
+    
+    upload = request.FILES.get('file')
+    if upload:
+        content = upload.read().decode('utf-8-sig', errors='replace')
+        file_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+    else:
+        content = request.body.decode('utf-8-sig', errors='replace')
+        file_format = 'csv' if request.content_type == 'text/csv' else 'json'
+    
+    try:
+        rows = parse_visit_batch(content, file_format)
+    except VisitBatchError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    created, errors = ingest_visits(foodbank, rows)
+    if errors:
+        return JsonResponse({'success': False, 'error': 'Some visits are invalid', 'errors': errors}, status=400)
+    
+    return JsonResponse({'success': True, 'created': created})
+
+
+@login_required
+@foodbank_required
+@require_POST
+def visit_sync_api(request):
+    """
+    Receive visits the intake page queued while offline, as JSON
+    {"visits": [...]} with a client_uuid per visit. Resending a batch is
+    harmless: visits already recorded under their client_uuid are skipped.
+    """
+    try:
+        rows = parse_visit_batch(request.body.decode('utf-8', errors='replace'), 'json')
+    except VisitBatchError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    synced, rejected = sync_visits(request.user.foodbank, rows)
+    return JsonResponse({'success': True, 'synced': synced, 'rejected': rejected})
+
+
 @login_required
 @foodbank_required
 def visit_create(request):
@@ -152,53 +299,6 @@ def visit_create(request):
     else:
         form = VisitForm()
     
-    today = get_foodbank_today(foodbank)
-    month_start = today.replace(day=1)
-    
-    patrons_queryset = Patron.objects.filter(foodbank=foodbank)
-    patrons = []
-    
-    for patron in patrons_queryset:
-        # Get visits this month count
-        visits_this_month = Visit.objects.filter(
-            patron=patron,
-            visit_date__gte=month_start
-        ).count()
-        
-        # Get last visit
-        last_visit = Visit.objects.filter(patron=patron).order_by('-visit_date', '-id').first()
-        
-        patron_data = {
-            'id': patron.id,
-            'first_name': patron.first_name,
-            'last_name': patron.last_name,
-            'address': patron.address or '',
-            'city': patron.city or '',
-            'state': patron.state or '',
-            'zipcode': patron.zipcode,
-            'phone': patron.phone or '',
-            'comments': patron.comments or '',
-            'phone': patron.phone or '',
-            'visits_this_month': visits_this_month,
-        }
-        
-        # Add last visit data if exists
-        if last_visit:
-            # patron_data['last_visit_date'] = last_visit.visit_date.isoformat()
-            patron_data['last_visit_date'] = last_visit.visit_date.strftime('%Y-%m-%d')
-            patron_data['last_visit'] = {
-                'zipcode': last_visit.zipcode,
-                'household_size': last_visit.household_size,
-                'age_0_18': last_visit.age_0_18,
-                'age_19_59': last_visit.age_19_59,
-                'age_60_plus': last_visit.age_60_plus,
-            }
-        else:
-            patron_data['last_visit_date'] = None
-            patron_data['last_visit'] = None
-        
-        patrons.append(patron_data)
-    
     today = get_foodbank_today(foodbank)
     recent_visits = Visit.objects.filter(
         foodbank=foodbank,
@@ -223,7 +323,7 @@ def visit_create(request):
     
     context = {
         'form': form,
-        'patrons': json.dumps(patrons),
+        'foodbank': foodbank,
         'recent_visits': recent_visits,
         'todays_visit_count': todays_visit_count,
         'food_truck_enabled': foodbank.food_truck_enabled,
@@ -426,33 +526,26 @@ def patron_create(request):
 def patron_detail_api(request, patron_id):
     patron = get_object_or_404(Patron, id=patron_id, foodbank=request.user.foodbank)
     
-    # Get last visit data using the correct related name: visit_set
+    # Monthly counters and the last-visit snapshot (visits.counters) mean
+    # prefilling a returning patron doesn't need to look at their visits
+    first_day_of_month = get_foodbank_today(request.user.foodbank).replace(day=1)
+    counters = patron.monthly_visits.aggregate(
+        total=Sum('visit_count'),
+        this_month=Sum('visit_count', filter=Q(month=first_day_of_month)),
+    )
+    visit_count = counters['total'] or 0
+    visits_this_month = counters['this_month'] or 0
+    
     last_visit_data = None
-    visit_count = 0
-    visits_this_month = 0
     last_visit_date = None
-    
-    try:
-        last_visit = patron.visit_set.order_by('-visit_date').first()
-        visit_count = patron.visit_set.count()
-        
-        # Get visits this month
-        from django.utils import timezone
-        from datetime import datetime
-        now = timezone.now()
-        first_day_of_month = datetime(now.year, now.month, 1).date()
-        visits_this_month = patron.visit_set.filter(visit_date__gte=first_day_of_month).count()
-        
-        if last_visit:
-            last_visit_date = last_visit.visit_date.isoformat()
-            last_visit_data = {
-                'household_size': last_visit.household_size,
-                'age_0_18': last_visit.age_0_18,
-                'age_19_59': last_visit.age_19_59,
-                'age_60_plus': last_visit.age_60_plus,
-            }
-    except Exception as e:
-        print(f"Error fetching visits: {e}")
+    if patron.last_visit_date:
+        last_visit_date = patron.last_visit_date.isoformat()
+        last_visit_data = {
+            'household_size': patron.last_household_size,
+            'age_0_18': patron.last_age_0_18,
+            'age_19_59': patron.last_age_19_59,
+            'age_60_plus': patron.last_age_60_plus,
+        }
     
     return JsonResponse({
         'id': patron.id,
@@ -470,6 +563,49 @@ def patron_detail_api(request, patron_id):
     })
 
 
+@login_required
+@foodbank_required
+def patron_roster_api(request):
+    """
+    Patron roster for the visit intake form.
+    Returns a full snapshot, or only what changed since the `since` watermark
+    from a previous response.
+    """
+    since = None
+    since_param = request.GET.get('since', '').strip()
+    if since_param:
+        try:
+            since = parse_datetime(since_param)
+        except ValueError:
+            since = None
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    
+    return JsonResponse(sync_patron_roster(request.user.foodbank, since=since))
+
+
+@login_required
+@foodbank_required
+def patron_search_api(request):
+    """
+    Typeahead search for patrons by name, address, phone or zip.
+    Returns at most `limit` results, best matches first.
+    """
+    query = request.GET.get('q', '').strip()
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    
+    results = search_patrons(request.user.foodbank, query, limit=limit)
+    
+    return JsonResponse({
+        'results': results,
+        'total': len(results),
+    })
+
+
 @login_required
 @foodbank_required
 def patron_delete(request, pk):
@@ -492,133 +628,18 @@ def analytics_view(request):
     """View statistics and reports with real data"""
     foodbank = request.user.foodbank
     
-    from django.db.models import Sum, Count, Q
-    from django.utils import timezone
-    from datetime import timedelta
-    import json
-    
-    today = get_foodbank_today(foodbank)
-    month_start = today.replace(day=1)
-    thirty_days_ago = today - timedelta(days=30)
-    
-    # Quick Stats
-    visits_this_month = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).count()
-    
-    # Unique households this month (count distinct patrons + anonymous visits)
-    identified_households = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start,
-        patron__isnull=False
-    ).values('patron').distinct().count()
-    
-    anonymous_visits = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start,
-        patron__isnull=True
-    ).count()
-    
-    unique_households = identified_households + anonymous_visits
-    
-    # People served this month (sum of household sizes)
-    people_served = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).aggregate(total=Sum('household_size'))['total'] or 0
-    
-    # First-time visitors this month
-    first_time_visitors = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start,
-        first_visit_this_month=True
-    ).count()
-    
-    # Visits Over Time (last 30 days)
-    visits_by_date = {}
-    for i in range(30):
-        date = today - timedelta(days=29-i)
-        visits_by_date[date] = 0
-    
-    visit_counts = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=thirty_days_ago
-    ).values('visit_date').annotate(count=Count('id'))
-    
-    for item in visit_counts:
-        visits_by_date[item['visit_date']] = item['count']
-    
-    visits_over_time = {
-        'labels': [date.strftime('%b %d') for date in sorted(visits_by_date.keys())],
-        'values': [visits_by_date[date] for date in sorted(visits_by_date.keys())]
-    }
-    
-    # Age Distribution
-    age_totals = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).aggregate(
-        age_0_18=Sum('age_0_18'),
-        age_19_59=Sum('age_19_59'),
-        age_60_plus=Sum('age_60_plus')
-    )
-    
-    age_distribution = {
-        'labels': ['0-18 years', '19-59 years', '60+ years'],
-        'values': [
-            age_totals['age_0_18'] or 0,
-            age_totals['age_19_59'] or 0,
-            age_totals['age_60_plus'] or 0
-        ]
-    }
-    
-    # Top Zip Codes
-    zip_codes = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).values('zipcode').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    max_zip_count = zip_codes[0]['count'] if zip_codes else 1
-    zip_code_data = [
-        {
-            'zipcode': item['zipcode'],
-            'count': item['count'],
-            'percentage': (item['count'] / max_zip_count * 100) if max_zip_count > 0 else 0
-        }
-        for item in zip_codes
-    ]
-    
-    # Household Sizes
-    household_sizes = Visit.objects.filter(
-        foodbank=foodbank,
-        visit_date__gte=month_start
-    ).values('household_size').annotate(
-        count=Count('id')
-    ).order_by('household_size')
-    
-    max_household_count = max([item['count'] for item in household_sizes], default=1)
-    household_size_data = [
-        {
-            'size': item['household_size'],
-            'count': item['count'],
-            'percentage': (item['count'] / max_household_count * 100) if max_household_count > 0 else 0
-        }
-        for item in household_sizes
-    ]
+    stats = foodbank_statistics(foodbank)
     
     context = {
         'foodbank': foodbank,
-        'visits_this_month': visits_this_month,
-        'unique_households': unique_households,
-        'people_served': people_served,
-        'first_time_visitors': first_time_visitors,
-        'visits_over_time': json.dumps(visits_over_time),
-        'age_distribution': json.dumps(age_distribution),
-        'zip_code_data': zip_code_data,
-        'household_size_data': household_size_data,
+        'visits_this_month': stats['visits_this_month'],
+        'unique_households': stats['unique_households'],
+        'people_served': stats['people_served'],
+        'first_time_visitors': stats['first_time_visitors'],
+        'visits_over_time': json.dumps(stats['visits_over_time']),
+        'age_distribution': json.dumps(stats['age_distribution']),
+        'zip_code_data': with_percentages(stats['zip_codes'], 'zipcode'),
+        'household_size_data': with_percentages(stats['household_sizes'], 'size'),
     }
     
     return render(request, 'visits/account_analytics.html', context)